@@ -0,0 +1,205 @@
+"""Асинхронные обработчики часто читаемых эндпоинтов для режима ASGI.
+
+Обрабатывают только GET-запросы с токеном или без него. Остальные
+методы, неверный токен, невалидные параметры и 404 передаются
+синхронному вьюсету (sync_view), чтобы ответы совпадали во всех
+режимах. Права доступа для этих запросов не проверяются: на чтение
+все эндпоинты открыты."""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.http import HttpResponse
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from recipes.models import Recipe
+from . import conditional, feed_cache
+from .cache import INGREDIENTS_VERSION, RECIPES_VERSION, aget_version
+from .consts import INGREDIENTS_CACHE_TIMEOUT
+from .pagination import RecipeCursorPagination
+from .views import (
+    RecipeViewSet,
+    ingredients_cache_key,
+    ingredients_response,
+    render_ingredients
+)
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+async def authenticate(request):
+    """Пользователь по заголовку Authorization: Token <key>.
+
+    None, если токен передан, но неверен."""
+
+    auth = request.headers.get('Authorization', '').split()
+    if not auth or auth[0].lower() != 'token':
+        return AnonymousUser()
+    if len(auth) != 2:
+        return None
+    token = await Token.objects.select_related('user').filter(
+        key=auth[1]
+    ).afirst()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+async def delegate(sync_view, request, **kwargs):
+    return await sync_to_async(sync_view)(request, **kwargs)
+
+
+def json_response(data):
+    return HttpResponse(
+        JSONRenderer().render(data), content_type='application/json'
+    )
+
+
+async def get_viewset(request, action, **kwargs):
+    """Вьюсет рецептов с DRF-запросом для построения queryset
+    и сериализатора. None, если запрос нужно передать синхронному
+    вьюсету"""
+
+    if request.method not in READ_METHODS or 'format' in request.GET:
+        return None
+    user = await authenticate(request)
+    if user is None:
+        return None
+    drf_request = Request(request)
+    drf_request.user = user
+    request.metrics_view = f'RecipeViewSet.{action}'
+    return RecipeViewSet(
+        request=drf_request,
+        format_kwarg=None,
+        action=action,
+        args=(),
+        kwargs=kwargs
+    )
+
+
+@csrf_exempt
+async def ingredient_list(request, sync_view):
+    if request.method not in READ_METHODS:
+        return await delegate(sync_view, request)
+    request.metrics_view = 'IngredientViewSet.list'
+    name = request.GET.get('name', '')
+    key = ingredients_cache_key(await aget_version(INGREDIENTS_VERSION), name)
+    cached = await cache.aget(key)
+    if cached is None:
+        # индекс ингредиентов перестраивается синхронно
+        cached = await sync_to_async(render_ingredients)(name)
+        await cache.aset(key, cached, INGREDIENTS_CACHE_TIMEOUT)
+    return ingredients_response(request, *cached)
+
+
+@csrf_exempt
+async def recipe_list(request, sync_view):
+    viewset = await get_viewset(request, 'list')
+    cursor_param = RecipeCursorPagination.cursor_query_param
+    if viewset is None or cursor_param in request.GET:
+        return await delegate(sync_view, request)
+    validators = await conditional.aget_list_validators(
+        viewset.request.user
+    )
+    response = conditional.not_modified(request, *validators)
+    if response is None:
+        response = await render_recipe_list(request, viewset)
+        if response is None:
+            return await delegate(sync_view, request)
+    return conditional.set_validators(response, *validators)
+
+
+async def render_recipe_list(request, viewset):
+    """Страница ленты. None, если запрос нужно передать синхронному
+    вьюсету"""
+
+    user = viewset.request.user
+    cacheable = feed_cache.is_cacheable(request)
+    if cacheable:
+        data = await feed_cache.aget_page(request)
+        if data is not None:
+            return json_response(feed_cache.personalize(
+                data, await feed_cache.aget_overlay(user)
+            ))
+        version = await aget_version(RECIPES_VERSION)
+        queryset = viewset.get_shared_queryset()
+    else:
+        queryset = viewset.get_queryset()
+    if request.GET.keys() & set(viewset.filterset_class.base_filters):
+        # валидация фильтра по автору обращается к БД
+        try:
+            queryset = await sync_to_async(viewset.filter_queryset)(
+                queryset
+            )
+        except APIException:
+            return None
+
+    pagination = viewset.paginator
+    paginator = pagination.django_paginator_class(
+        queryset, pagination.get_page_size(viewset.request)
+    )
+    paginator.count = await queryset.acount()
+    number = request.GET.get(pagination.page_query_param) or 1
+    if number in pagination.last_page_strings:
+        number = paginator.num_pages
+    try:
+        page = paginator.page(number)
+    except InvalidPage:
+        return None
+    page.object_list = [recipe async for recipe in page.object_list]
+    pagination.page = page
+    pagination.request = viewset.request
+
+    serializer = viewset.get_serializer(page.object_list, many=True)
+    data = {
+        'count': paginator.count,
+        'next': pagination.get_next_link(),
+        'previous': pagination.get_previous_link(),
+        'results': serializer.data,
+    }
+    if not cacheable:
+        return json_response(data)
+    await feed_cache.aset_page(request, data, version)
+    return json_response(feed_cache.personalize(
+        data, await feed_cache.aget_overlay(user)
+    ))
+
+
+@csrf_exempt
+async def recipe_detail(request, pk, sync_view):
+    viewset = await get_viewset(request, 'retrieve', pk=pk)
+    if viewset is None:
+        return await delegate(sync_view, request, pk=pk)
+    validators = await conditional.aget_recipe_validators(
+        pk, viewset.request.user
+    )
+    if validators is None:
+        return await delegate(sync_view, request, pk=pk)
+    response = conditional.not_modified(request, *validators)
+    if response is None:
+        recipe = await viewset.get_queryset().filter(pk=pk).afirst()
+        if recipe is None:
+            return await delegate(sync_view, request, pk=pk)
+        response = json_response(viewset.get_serializer(recipe).data)
+    return conditional.set_validators(response, *validators)
+
+
+@csrf_exempt
+async def recipe_get_link(request, pk, sync_view):
+    if request.method not in READ_METHODS:
+        return await delegate(sync_view, request, pk=pk)
+    request.metrics_view = 'RecipeViewSet.get_link'
+    code = await Recipe.objects.filter(pk=pk).values_list(
+        'short_code', flat=True
+    ).afirst()
+    if code is None:
+        return await delegate(sync_view, request, pk=pk)
+    url = reverse('recipes:short_link', args=(code,))
+    return json_response({'short-link': request.build_absolute_uri(url)})
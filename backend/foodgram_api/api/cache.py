@@ -0,0 +1,50 @@
+import time
+
+from django.core.cache import cache
+
+# версия каталога ингредиентов
+INGREDIENTS_VERSION = 'ingredients'
+# версия ленты рецептов (рецепты, их состав и авторы)
+RECIPES_VERSION = 'recipes'
+# счетчик изменений состава рецептов для индекса подбора
+# по ингредиентам (recipes.models.ChangeCounter)
+RECIPE_INGREDIENTS_VERSION = 'recipe-ingredients'
+# версия кодов коротких ссылок в кэшах процессов
+SHORT_LINKS_VERSION = 'short-links'
+
+
+def version_key(name):
+    return f'version:{name}'
+
+
+def get_version(name):
+    """Текущая версия набора данных для построения ключей кэша"""
+
+    version = cache.get(version_key(name))
+    if version is None:
+        # после вытеснения ключа версия начинается с текущего времени,
+        # чтобы не совпасть с версиями уже закэшированных ответов
+        cache.add(version_key(name), time.time_ns(), timeout=None)
+        version = cache.get(version_key(name))
+    return version
+
+
+async def aget_version(name):
+    """Асинхронный вариант get_version"""
+
+    version = await cache.aget(version_key(name))
+    if version is None:
+        await cache.aadd(version_key(name), time.time_ns(), timeout=None)
+        version = await cache.aget(version_key(name))
+    return version
+
+
+def bump_version(name):
+    """Смена версии делает недоступными все ответы,
+    закэшированные под предыдущей версией"""
+
+    try:
+        return cache.incr(version_key(name))
+    except ValueError:
+        cache.set(version_key(name), time.time_ns(), timeout=None)
+        return cache.get(version_key(name))
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from .shopping_list import get_pdf_font
+
+# кэши, которые видит только записавший в них процесс
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_processes():
+    """Число процессов, которые читают кэш и публикуют инвалидацию:
+    воркеры сервера и обработчик очереди задач в БД"""
+
+    return settings.WEB_WORKERS + (settings.TASKS_BACKEND == 'database')
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Версии шины инвалидации (api.invalidation) хранятся в кэше.
+    В кэше процесса смена версии не доходит до остальных процессов,
+    и они отдают устаревшие ленты, ингредиенты и ответы 304"""
+
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in LOCAL_CACHE_BACKENDS or cache_processes() < 2:
+        return []
+    return [Error(
+        f'Кэш {backend} не общий для {cache_processes()} процессов '
+        f'(WEB_WORKERS={settings.WEB_WORKERS}, '
+        f'TASKS_BACKEND={settings.TASKS_BACKEND}).',
+        hint=(
+            'Установите CACHE_BACKEND=redis (или file, если все процессы '
+            'работают на одном хосте), либо WEB_WORKERS=1 '
+            'и TASKS_BACKEND=thread.'
+        ),
+        id='api.E001',
+    )]
+
+
+@register()
+def check_pdf_font(app_configs, **kwargs):
+    """Выгрузка списка покупок в PDF требует шрифта с кириллицей"""
+
+    if get_pdf_font() is not None:
+        return []
+    return [Warning(
+        'Не найден шрифт SHOPPING_LIST_PDF_FONT='
+        f'{settings.SHOPPING_LIST_PDF_FONT}: выгрузка списка покупок '
+        'в PDF отвечает 406.',
+        hint='Установите пакет fonts-dejavu-core или укажите путь '
+             'к шрифту TrueType с кириллицей.',
+        id='api.W001',
+    )]
@@ -0,0 +1,125 @@
+"""Условные GET-запросы к рецептам.
+
+ETag ленты складывается из версии ленты RECIPES_VERSION, которая
+меняется при любом изменении рецептов, их состава и авторов,
+и версии пользователя, от которой зависят флаги избранного,
+корзины и подписки. ETag рецепта от изменений других рецептов
+не зависит: он складывается из времени изменения рецепта (правки
+рецепта, его состава и изображения), версии его автора, версии
+каталога ингредиентов и версии пользователя. Совпадение ETag
+проверяется до построения ответа, поэтому ответ 304 не требует
+сериализации, а для рецепта — ничего, кроме чтения одной строки.
+
+Last-Modified рецепта берется из времени его изменения и отдается
+только анонимному пользователю: для остальных ответ меняется вместе
+с флагами, время изменения которых не хранится. Время изменения
+не учитывает правки автора и ингредиентов, поэтому при наличии
+If-None-Match заголовок If-Modified-Since не проверяется."""
+
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from recipes.models import Recipe
+from .cache import (
+    INGREDIENTS_VERSION,
+    RECIPES_VERSION,
+    aget_version,
+    get_version
+)
+from .invalidation import author_tag, user_tag
+
+
+def make_etag(*parts):
+    return '"{}"'.format(
+        hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    )
+
+
+def recipe_row(pk):
+    queryset = Recipe.objects.values_list('updated_at', 'author_id')
+    try:
+        return queryset.filter(pk=pk)
+    except (TypeError, ValueError):
+        # на некорректный id вьюсет отвечает 404
+        return queryset.none()
+
+
+def detail_validators(updated_at, user, versions):
+    """ETag и время изменения рецепта в секундах"""
+
+    last_modified = None
+    if not user.is_authenticated:
+        last_modified = int(updated_at.timestamp())
+    return make_etag('recipe', updated_at.isoformat(), *versions), (
+        last_modified
+    )
+
+
+def get_recipe_validators(pk, user):
+    """Валидаторы ответа с рецептом или None, если рецепта нет"""
+
+    row = recipe_row(pk).first()
+    if row is None:
+        return None
+    updated_at, author_id = row
+    return detail_validators(updated_at, user, (
+        get_version(author_tag(author_id)),
+        get_version(INGREDIENTS_VERSION),
+        get_version(user_tag(user.id)) if user.is_authenticated else None
+    ))
+
+
+async def aget_recipe_validators(pk, user):
+    """Асинхронный вариант get_recipe_validators"""
+
+    row = await recipe_row(pk).afirst()
+    if row is None:
+        return None
+    updated_at, author_id = row
+    return detail_validators(updated_at, user, (
+        await aget_version(author_tag(author_id)),
+        await aget_version(INGREDIENTS_VERSION),
+        await aget_version(user_tag(user.id))
+        if user.is_authenticated else None
+    ))
+
+
+def get_list_validators(user):
+    """Валидаторы страницы ленты, запросов к БД не требуют"""
+
+    return make_etag(
+        'recipes', get_version(RECIPES_VERSION),
+        get_version(user_tag(user.id)) if user.is_authenticated else None
+    ), None
+
+
+async def aget_list_validators(user):
+    """Асинхронный вариант get_list_validators"""
+
+    return make_etag(
+        'recipes', await aget_version(RECIPES_VERSION),
+        await aget_version(user_tag(user.id))
+        if user.is_authenticated else None
+    ), None
+
+
+def not_modified(request, etag, last_modified):
+    """Ответ 304 или None, если ответ нужно построить"""
+
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+
+
+def set_validators(response, etag, last_modified):
+    """Заголовки ETag и Last-Modified. Ответ зависит от токена,
+    поэтому кэши различают ответы по заголовку Authorization"""
+
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Authorization', ))
+    return response
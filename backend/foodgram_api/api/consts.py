@@ -3,3 +3,44 @@ MAX_INGREDIENT_VALUE = 32000
 
 MIN_COOKING_TIME = 1
 MAX_COOKING_TIME = 32000
+
+# время жизни закэшированного ответа каталога ингредиентов (в секундах)
+INGREDIENTS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# время жизни закэшированных страниц ленты и множеств избранного,
+# корзины и подписок пользователя (в секундах)
+FEED_CACHE_TIMEOUT = 60 * 60
+FEED_OVERLAY_TIMEOUT = 60 * 60
+
+# время жизни закэшированного количества рецептов в ленте (в секундах)
+RECIPES_COUNT_CACHE_TIMEOUT = 60
+
+# символы кода короткой ссылки (base62)
+SHORT_CODE_ALPHABET = (
+    '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+)
+# размер и время жизни записей (в секундах) кэша коротких ссылок
+# в памяти процесса
+SHORT_LINK_LRU_SIZE = 10000
+SHORT_LINK_LRU_TIMEOUT = 60 * 5
+# как часто процесс сверяет версию кодов в общем кэше (в секундах):
+# столько может устареть код в кэше процесса после сброса
+SHORT_LINK_VERSION_INTERVAL = 1
+# время жизни кодов в общем кэше: найденных и несуществующих
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60 * 24
+SHORT_LINK_MISSING_TIMEOUT = 60
+# счетчики переходов сбрасываются в БД пачкой по достижении
+# количества переходов или интервала (в секундах)
+SHORT_LINK_FLUSH_SIZE = 100
+SHORT_LINK_FLUSH_INTERVAL = 10
+
+# число изменений рецептов, которые процесс применяет к своему индексу
+# ингредиентов из журнала вместо полного перестроения, и время жизни
+# записей журнала (в секундах)
+RECIPE_INDEX_JOURNAL_SIZE = 1000
+RECIPE_INDEX_JOURNAL_TIMEOUT = 60 * 60
+# наибольшее число рецептов в одном запросе пакетного добавления
+# в избранное/корзину и удаления из них
+MAX_BULK_RECIPES = 100
+# наибольшее число недостающих ингредиентов в подборе рецептов
+MAX_MISSING_INGREDIENTS = 5
@@ -0,0 +1,134 @@
+"""Двухслойный кэш ленты рецептов.
+
+Страница ленты кэшируется один раз для всех пользователей в том виде,
+в каком ее видит анонимный пользователь, под версией RECIPES_VERSION.
+Флаги is_favorited, is_in_shopping_cart и author.is_subscribed
+накладываются при ответе из множеств id избранного, корзины
+и подписок пользователя, которые загружаются тремя запросами
+и кэшируются под версией пользователя.
+Версии увеличивает шина инвалидации (api.invalidation)."""
+
+import hashlib
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+from .cache import RECIPES_VERSION, aget_version, get_version
+from .consts import FEED_CACHE_TIMEOUT, FEED_OVERLAY_TIMEOUT
+from .invalidation import user_tag
+
+# параметры ленты, результат которых зависит от пользователя
+USER_PARAMS = frozenset(('is_favorited', 'is_in_shopping_cart'))
+
+
+def is_cacheable(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.GET.keys() & USER_PARAMS
+    )
+
+
+def page_key(version, request):
+    """Ключ страницы: адрес запроса с упорядоченными параметрами.
+    Хост входит в ключ, так как ссылки в ответе абсолютные"""
+
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    url = f'{request.get_host()}{request.path}?{query}'
+    return 'feed:{}:{}'.format(
+        version, hashlib.md5(url.encode()).hexdigest()
+    )
+
+
+def get_page(request):
+    return cache.get(page_key(get_version(RECIPES_VERSION), request))
+
+
+async def aget_page(request):
+    return await cache.aget(
+        page_key(await aget_version(RECIPES_VERSION), request)
+    )
+
+
+def set_page(request, data, version):
+    """Сохранение страницы под версией, прочитанной до построения,
+    чтобы страница, построенная во время изменения рецептов,
+    не попала под новую версию"""
+
+    cache.set(page_key(version, request), data, FEED_CACHE_TIMEOUT)
+
+
+async def aset_page(request, data, version):
+    await cache.aset(page_key(version, request), data, FEED_CACHE_TIMEOUT)
+
+
+def overlay_key(user_id, version):
+    return f'feed-overlay:{user_id}:{version}'
+
+
+def overlay_querysets(user):
+    # сортировка моделей по умолчанию добавила бы ненужные JOIN
+    return (
+        Favorite.objects.filter(user=user).order_by().values_list(
+            'recipe_id', flat=True
+        ),
+        ShoppingCart.objects.filter(user=user).order_by().values_list(
+            'recipe_id', flat=True
+        ),
+        Follow.objects.filter(subscriber=user).order_by().values_list(
+            'author_id', flat=True
+        ),
+    )
+
+
+def get_overlay(user):
+    """Множества id избранных рецептов, рецептов в корзине
+    и авторов в подписках. None для анонимного пользователя"""
+
+    if not user.is_authenticated:
+        return None
+    key = overlay_key(user.id, get_version(user_tag(user.id)))
+    overlay = cache.get(key)
+    if overlay is None:
+        overlay = tuple(
+            frozenset(queryset) for queryset in overlay_querysets(user)
+        )
+        cache.set(key, overlay, FEED_OVERLAY_TIMEOUT)
+    return overlay
+
+
+async def aget_overlay(user):
+    """Асинхронный вариант get_overlay"""
+
+    if not user.is_authenticated:
+        return None
+    key = overlay_key(user.id, await aget_version(user_tag(user.id)))
+    overlay = await cache.aget(key)
+    if overlay is None:
+        overlay = tuple([
+            frozenset([item async for item in queryset])
+            for queryset in overlay_querysets(user)
+        ])
+        await cache.aset(key, overlay, FEED_OVERLAY_TIMEOUT)
+    return overlay
+
+
+def personalize(data, overlay):
+    """Страница с флагами пользователя вместо флагов анонима"""
+
+    if overlay is None:
+        return data
+    favorites, cart, follows = overlay
+    return {**data, 'results': [
+        {
+            **recipe,
+            'author': {
+                **recipe['author'],
+                'is_subscribed': recipe['author']['id'] in follows,
+            },
+            'is_favorited': recipe['id'] in favorites,
+            'is_in_shopping_cart': recipe['id'] in cart,
+        }
+        for recipe in data['results']
+    ]}
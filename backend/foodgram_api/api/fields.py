@@ -0,0 +1,121 @@
+import binascii
+import io
+import uuid
+
+import filetype
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import (
+    InMemoryUploadedFile,
+    TemporaryUploadedFile,
+    UploadedFile
+)
+
+from rest_framework import serializers
+
+from drf_extra_fields.fields import Base64ImageField
+
+# количество символов base64, декодируемых за раз (кратно 4)
+BASE64_CHUNK_SIZE = 64 * 1024
+# в пределах этой длины ищется заголовок data URI
+DATA_URI_HEADER_LIMIT = 256
+
+
+def open_upload(name, content_type, size):
+    """Файл для декодированных данных: как и при обычной загрузке,
+    небольшие файлы хранятся в памяти, остальные - во временном файле"""
+
+    if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+        return TemporaryUploadedFile(name, content_type, 0, None)
+    return InMemoryUploadedFile(
+        io.BytesIO(), None, name, content_type, 0, None
+    )
+
+
+def decode_base64_image(
+    data, start=0, end=None, allowed_types=Base64ImageField.ALLOWED_TYPES
+):
+    """Потоковое декодирование изображения из base64 в data[start:end].
+
+    data - строка или байты, данные декодируются порциями по
+    BASE64_CHUNK_SIZE, поэтому полная копия ни строки, ни декодированных
+    байтов в памяти не создается. Тип файла проверяется по первой порции
+    до декодирования остальных данных. Возвращает None для
+    неподдерживаемого типа, для некорректного base64 выбрасывает
+    ValueError."""
+
+    end = len(data) if end is None else end
+    upload = None
+    tail = data[:0]
+    try:
+        for offset in range(start, end, BASE64_CHUNK_SIZE):
+            chunk = data[offset:min(offset + BASE64_CHUNK_SIZE, end)]
+            chunk = tail + chunk[:0].join(chunk.split())
+            cut = len(chunk) - len(chunk) % 4
+            chunk, tail = chunk[:cut], chunk[cut:]
+            content = binascii.a2b_base64(chunk)
+            if upload is None:
+                kind = filetype.guess(content)
+                if kind is None or kind.extension not in allowed_types:
+                    return None
+                upload = open_upload(
+                    f'{uuid.uuid4()}.{kind.extension}',
+                    kind.mime,
+                    (end - start) * 3 // 4
+                )
+            upload.write(content)
+        if tail:
+            upload.write(binascii.a2b_base64(tail))
+    except Exception:
+        if upload is not None:
+            upload.close()
+        raise
+    if upload is None:
+        raise ValueError('Пустые данные изображения')
+    upload.size = upload.tell()
+    upload.seek(0)
+    return upload
+
+
+class ImageField(Base64ImageField):
+    """Изображение в base64. Файл сохраняется как есть,
+    уменьшение и удаление метаданных выполняет фоновая задача.
+
+    Строка декодируется потоково, обычно еще при разборе запроса
+    в Base64JSONParser, и сюда приходит уже готовый файл."""
+
+    def to_internal_value(self, data):
+        if data in self.EMPTY_VALUES:
+            return None
+        if isinstance(data, str):
+            start = data.find(';base64,', 0, DATA_URI_HEADER_LIMIT)
+            start = 0 if start == -1 else start + len(';base64,')
+            try:
+                data = decode_base64_image(
+                    data, start, allowed_types=self.ALLOWED_TYPES
+                )
+            except ValueError:
+                raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+            if data is None:
+                raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        elif not isinstance(data, UploadedFile):
+            return super().to_internal_value(data)
+        return serializers.ImageField.to_internal_value(self, data)
+
+
+class ImageVariantsField(serializers.Field):
+    """Ссылки на миниатюры и WebP-копию изображения"""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, variants):
+        request = self.context.get('request')
+        urls = {}
+        for variant, name in (variants or {}).items():
+            url = default_storage.url(name)
+            urls[variant] = (
+                request.build_absolute_uri(url) if request else url
+            )
+        return urls
@@ -2,6 +2,7 @@ from django_filters import rest_framework as filters
 from django_filters.filters import ChoiceFilter
 
 from recipes.models import Ingredient, Recipe
+from recipes.search import search_recipes
 
 
 class IngredientFilter(filters.FilterSet):
@@ -26,23 +27,30 @@ class RecipeFilter(filters.FilterSet):
         choices=STATUS_CHOICES, method='get_is_favorited')
     is_in_shopping_cart = ChoiceFilter(
         choices=STATUS_CHOICES, method='get_is_in_shopping_cart')
+    search = filters.CharFilter(method='get_search')
 
     def get_is_favorited(self, queryset, name, value):
         user = self.request.user  # type: ignore
         if user.is_authenticated and value:
-            return Recipe.objects.filter(favorites__user=user)
+            return queryset.filter(favorites__user=user)
         return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user  # type: ignore
         if user.is_authenticated and value:
-            return Recipe.objects.filter(shopping_carts__user=user)
+            return queryset.filter(shopping_carts__user=user)
         return queryset
 
+    def get_search(self, queryset, name, value):
+        """Полнотекстовый поиск с сортировкой по релевантности"""
+
+        return search_recipes(queryset, value)
+
     class Meta:
         model = Recipe
         fields = (
             'author',
             'is_favorited',
-            'is_in_shopping_cart'
+            'is_in_shopping_cart',
+            'search'
         )
@@ -0,0 +1,63 @@
+import threading
+from bisect import bisect_left
+
+from recipes.models import Ingredient
+from .cache import INGREDIENTS_VERSION, get_version
+
+# символ, который больше любого другого при сравнении строк
+MAX_CHAR = chr(0x10FFFF)
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для поиска по префиксу.
+
+    Названия в верхнем регистре хранятся в отсортированном массиве,
+    поэтому префикс находится двоичным поиском. Найденные строки
+    возвращаются в порядке, в котором их отдала БД, то есть так же,
+    как при фильтрации name__istartswith.
+    Индекс загружается при первом обращении и перестраивается,
+    когда меняется версия каталога."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        # строки в порядке БД, ключи и позиции строк в порядке ключей
+        self._data = ([], [], [])
+
+    def _build(self, version):
+        rows = [
+            {'id': pk, 'name': name, 'measurement_unit': unit}
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        ]
+        positions = sorted(
+            range(len(rows)),
+            key=lambda position: rows[position]['name'].upper()
+        )
+        keys = [rows[position]['name'].upper() for position in positions]
+        self._data = (rows, keys, positions)
+        self._version = version
+
+    def _actualize(self):
+        version = get_version(INGREDIENTS_VERSION)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._build(version)
+        return self._data
+
+    def search(self, prefix=''):
+        """Ингредиенты, название которых начинается с prefix
+        без учета регистра"""
+
+        rows, keys, positions = self._actualize()
+        if not prefix:
+            return list(rows)
+        prefix = prefix.upper()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + MAX_CHAR, start)
+        return [rows[position] for position in sorted(positions[start:end])]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,242 @@
+"""Шина инвалидации кэшей.
+
+Изменения моделей переводятся в теги (MODEL_TAGS, USER_TAG_FIELDS,
+AUTHOR_TAG_FIELDS). Теги, накопленные за транзакцию, публикуются одним
+пакетом после ее фиксации, поэтому откаченные изменения кэш
+не сбрасывают. Публикацию выполняет брокер из настройки
+INVALIDATION_BROADCASTER: по умолчанию он увеличивает версии тегов
+в общем кэше, от которых зависят ключи закэшированных ответов
+и индексы в памяти всех процессов.
+
+Сохранение и удаление объектов отслеживается сигналами. Для моделей
+из TRACKED_FIELDS сохранение сравнивает поля со значениями при
+загрузке объекта и сбрасывает кэш только при их изменении. Удаление
+через QuerySet.delete при подключенных сигналах тоже отправляет их
+для каждого объекта. Массовые операции без сигналов (update,
+bulk_create и bulk_update, который выполняет update) отслеживает
+InvalidatingQuerySet."""
+
+import threading
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils.module_loading import import_string
+
+from .cache import INGREDIENTS_VERSION, RECIPES_VERSION, bump_version
+
+# теги, которые сбрасывает любое изменение модели
+MODEL_TAGS = {
+    'recipes.recipe': (RECIPES_VERSION, ),
+    'recipes.recipeingredient': (RECIPES_VERSION, ),
+    'recipes.ingredient': (INGREDIENTS_VERSION, RECIPES_VERSION),
+    'recipes.favorite': (),
+    'recipes.shoppingcart': (),
+    'users.follow': (),
+    'users.user': (RECIPES_VERSION, ),
+}
+# поле с id пользователя, чьи данные сбрасывает изменение модели
+USER_TAG_FIELDS = {
+    'recipes.favorite': 'user_id',
+    'recipes.shoppingcart': 'user_id',
+    'users.follow': 'subscriber_id',
+}
+# поле с id автора, чьи рецепты сбрасывает изменение модели:
+# данные автора выводятся в каждом его рецепте
+AUTHOR_TAG_FIELDS = {
+    'users.user': 'id',
+}
+# поля, от которых зависят закэшированные данные. Сохранение
+# объекта сбрасывает кэш, только если одно из них изменилось:
+# вход (last_login), смена пароля и регистрация ленту не сбрасывают
+TRACKED_FIELDS = {
+    'users.user': frozenset(
+        ('email', 'username', 'first_name', 'last_name', 'avatar')
+    ),
+}
+# связь с объектами, без которых изменение модели не видно в кэше:
+# данные пользователя без рецептов в ленту не попадают
+TRACKED_RELATIONS = {
+    'users.user': 'recipes',
+}
+
+
+def user_tag(user_id):
+    return f'user:{user_id}'
+
+
+def author_tag(user_id):
+    return f'author:{user_id}'
+
+
+class Broadcaster:
+    """Доставка пакета тегов всем процессам"""
+
+    def publish(self, tags):
+        raise NotImplementedError
+
+
+class CacheVersionBroadcaster(Broadcaster):
+    """Увеличение версий тегов в общем кэше. Процессы сверяют
+    версии при чтении, отдельная доставка сообщений не нужна"""
+
+    def publish(self, tags):
+        for tag in tags:
+            bump_version(tag)
+
+
+@lru_cache(maxsize=None)
+def get_broadcaster():
+    return import_string(settings.INVALIDATION_BROADCASTER)()
+
+
+_local = threading.local()
+
+
+def flush():
+    tags, _local.pending = _local.pending, None
+    get_broadcaster().publish(tags)
+
+
+def invalidate(*tags):
+    """Публикация тегов после фиксации текущей транзакции.
+
+    Все теги транзакции публикуются одним пакетом, вне транзакции
+    теги публикуются сразу."""
+
+    if not tags:
+        return
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        get_broadcaster().publish(set(tags))
+        return
+    # после отката транзакции или точки сохранения ее обработчик
+    # удаляется из очереди и регистрируется заново
+    if getattr(_local, 'pending', None) is None or not any(
+        func is flush for _, func, _ in connection.run_on_commit
+    ):
+        _local.pending = set()
+        transaction.on_commit(flush)
+    _local.pending.update(tags)
+
+
+def model_tags(model):
+    return set(MODEL_TAGS.get(model._meta.label_lower, ()))
+
+
+# поля с id пользователей и теги, которые они задают
+TAG_FIELDS = ((USER_TAG_FIELDS, user_tag), (AUTHOR_TAG_FIELDS, author_tag))
+
+
+def instance_tags(instance):
+    tags = model_tags(instance)
+    for fields, tag in TAG_FIELDS:
+        field = fields.get(instance._meta.label_lower)
+        if field is not None:
+            tags.add(tag(getattr(instance, field)))
+    return tags
+
+
+def queryset_tags(queryset):
+    """Теги строк queryset, id пользователей читаются одним запросом
+    на поле"""
+
+    tags = model_tags(queryset.model)
+    for fields, tag in TAG_FIELDS:
+        field = fields.get(queryset.model._meta.label_lower)
+        if field is not None:
+            tags.update(
+                tag(user_id) for user_id in queryset.order_by().values_list(
+                    field, flat=True
+                ).distinct()
+            )
+    return tags
+
+
+def tracked_values(instance, fields):
+    """Загруженные значения отслеживаемых полей. Отложенные поля
+    пропускаются, чтобы не читать их из БД"""
+
+    values = {}
+    for name in fields:
+        attname = instance._meta.get_field(name).attname
+        if attname in instance.__dict__:
+            value = instance.__dict__[attname]
+            # файловые поля хранят строку или FieldFile
+            values[name] = getattr(value, 'name', value)
+    return values
+
+
+def remember_tracked(sender, instance, **kwargs):
+    instance._tracked_values = tracked_values(
+        instance, TRACKED_FIELDS[sender._meta.label_lower]
+    )
+
+
+def tracked_changed(instance, fields, update_fields):
+    """Изменилось ли отслеживаемое поле с момента загрузки
+    или прошлого сохранения объекта"""
+
+    if update_fields is not None:
+        fields = fields & set(update_fields)
+    previous = getattr(instance, '_tracked_values', {})
+    current = tracked_values(instance, fields)
+    instance._tracked_values = {**previous, **current}
+    return any(
+        name not in previous or previous[name] != current.get(name)
+        for name in fields
+    )
+
+
+def model_changed(sender, instance, **kwargs):
+    invalidate(*instance_tags(instance))
+
+
+def model_saved(sender, instance, created, update_fields=None, **kwargs):
+    label = sender._meta.label_lower
+    fields = TRACKED_FIELDS.get(label)
+    if fields:
+        relation = TRACKED_RELATIONS.get(label)
+        if created or not tracked_changed(
+            instance, fields, update_fields
+        ) or relation and not getattr(instance, relation).exists():
+            # новый объект еще не связан с закэшированными данными
+            return
+    model_changed(sender, instance)
+
+
+def connect():
+    for label in MODEL_TAGS:
+        model = apps.get_model(label)
+        dispatch_uid = f'invalidation:{label}'
+        post_save.connect(
+            model_saved, sender=model, dispatch_uid=dispatch_uid
+        )
+        post_delete.connect(
+            model_changed, sender=model, dispatch_uid=dispatch_uid
+        )
+    for label in TRACKED_FIELDS:
+        post_init.connect(
+            remember_tracked, sender=apps.get_model(label),
+            dispatch_uid=f'invalidation:tracked:{label}'
+        )
+
+
+class InvalidatingQuerySet(QuerySet):
+    """QuerySet, публикующий теги при массовых изменениях,
+    которые не отправляют сигналы моделей"""
+
+    def update(self, **kwargs):
+        tags = queryset_tags(self)
+        updated = super().update(**kwargs)
+        if updated:
+            invalidate(*tags)
+        return updated
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        invalidate(*set().union(*map(instance_tags, objs)))
+        return objs
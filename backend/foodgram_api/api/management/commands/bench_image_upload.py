@@ -0,0 +1,100 @@
+import base64
+import io
+import json
+import multiprocessing
+import os
+import resource
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.fields import ImageField
+from api.parsers import Base64JSONParser
+
+MODES = {
+    'base64': (JSONParser, Base64ImageField),
+    'stream': (Base64JSONParser, ImageField),
+}
+
+
+def max_rss():
+    """Пиковый RSS процесса в МБ (ru_maxrss в Linux - в килобайтах)"""
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def upload(body, parser_class, field_class):
+    request = Request(
+        APIRequestFactory().post(
+            '/api/recipes/', body, content_type='application/json'
+        ),
+        parsers=[parser_class()]
+    )
+    image = field_class().run_validation(request.data['image'])
+    image.close()
+
+
+def run_mode(mode, body, concurrency, repeat, results):
+    parser_class, field_class = MODES[mode]
+    baseline = max_rss()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(
+            lambda _: upload(body, parser_class, field_class),
+            range(concurrency * repeat)
+        ))
+    results.put((mode, max_rss() - baseline))
+
+
+class Command(BaseCommand):
+    help = ('Сравнение пикового потребления памяти при параллельной '
+            'загрузке изображений в base64: полное декодирование строки '
+            'и потоковое декодирование при разборе запроса')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=float, default=10,
+            help='Размер изображения в МБ'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Количество одновременных загрузок'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=2,
+            help='Количество загрузок на поток'
+        )
+
+    def make_body(self, size):
+        # случайный шум почти не сжимается, размер PNG близок к size
+        side = int((size * 1024 * 1024 / 3) ** 0.5)
+        image = Image.frombytes('RGB', (side, side), os.urandom(side**2 * 3))
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG', compress_level=1)
+        encoded = base64.b64encode(buffer.getvalue()).decode()
+        return json.dumps({'image': f'data:image/png;base64,{encoded}'})
+
+    def handle(self, *args, **options):
+        body = self.make_body(options['size'])
+        self.stdout.write(
+            f'Тело запроса: {len(body) / 1024 / 1024:.1f} МБ, '
+            f'одновременных загрузок: {options["concurrency"]}'
+        )
+        # каждый режим измеряется в отдельном процессе,
+        # так как ru_maxrss только растет
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        for mode in MODES:
+            process = context.Process(target=run_mode, args=(
+                mode, body, options['concurrency'], options['repeat'],
+                results
+            ))
+            process.start()
+            process.join()
+            mode, peak = results.get()
+            self.stdout.write(f'{mode}: прирост пикового RSS {peak:.1f} МБ')
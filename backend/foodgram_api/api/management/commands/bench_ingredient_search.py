@@ -0,0 +1,57 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import Ingredient
+from api.ingredient_index import ingredient_index
+
+
+class Command(BaseCommand):
+    help = ('Сравнение поиска ингредиентов по префиксу '
+            'через индекс в памяти и через ORM')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Количество повторов для каждого префикса'
+        )
+
+    def measure(self, search, prefixes, repeat):
+        started = perf_counter()
+        for _ in range(repeat):
+            for prefix in prefixes:
+                search(prefix)
+        return (perf_counter() - started) / (repeat * len(prefixes)) * 10**6
+
+    def handle(self, *args, **options):
+        names = Ingredient.objects.values_list('name', flat=True)
+        prefixes = sorted({
+            name[:length] for name in names[:200] for length in (1, 2, 3)
+        })
+        if not prefixes:
+            self.stderr.write('Каталог ингредиентов пуст.')
+            return
+
+        ingredient_index.search()
+        mismatches = [
+            prefix for prefix in prefixes
+            if [row['id'] for row in ingredient_index.search(prefix)]
+            != list(Ingredient.objects.filter(
+                name__istartswith=prefix).values_list('id', flat=True))
+        ]
+
+        repeat = options['repeat']
+        index_time = self.measure(ingredient_index.search, prefixes, repeat)
+        orm_time = self.measure(
+            lambda prefix: list(Ingredient.objects.filter(
+                name__istartswith=prefix
+            ).values('id', 'name', 'measurement_unit')),
+            prefixes,
+            repeat
+        )
+        self.stdout.write(
+            f'Префиксов: {len(prefixes)}, повторов: {repeat}\n'
+            f'Индекс: {index_time:.1f} мкс на запрос\n'
+            f'ORM: {orm_time:.1f} мкс на запрос\n'
+            f'Расхождений в результатах: {len(mismatches)}'
+        )
@@ -0,0 +1,158 @@
+import random
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import Cast
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from api.recipe_index import build, rank
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Подбор рецептов по ингредиентам на синтетическом каталоге: '
+            'обратный индекс в памяти и (с --sql) запрос через ORM')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=100000,
+            help='Количество рецептов в каталоге'
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=2000,
+            help='Количество ингредиентов в каталоге'
+        )
+        parser.add_argument(
+            '--queries', type=int, default=50,
+            help='Количество запросов для каждого значения missing'
+        )
+        parser.add_argument(
+            '--sql', action='store_true',
+            help='Сравнить с запросом к БД (данные вставляются '
+                 'в транзакции, которая затем откатывается)'
+        )
+
+    def catalogue(self, recipes, ingredients):
+        """Пары (рецепт, ингредиент): от 3 до 12 ингредиентов
+        на рецепт, популярность ингредиентов убывает по закону Ципфа"""
+
+        population = range(1, ingredients + 1)
+        weights = [1 / number for number in population]
+        rows = []
+        for recipe_id in range(1, recipes + 1):
+            size = random.randint(3, 12)
+            chosen = set()
+            while len(chosen) < size:
+                chosen.update(random.choices(population, weights, k=size))
+            rows.extend(
+                (recipe_id, ingredient_id)
+                for ingredient_id in sorted(chosen)[:size]
+            )
+        return rows, population, weights
+
+    def measure(self, match, queries, missing):
+        started = perf_counter()
+        found = sum(len(match(query, missing)) for query in queries)
+        elapsed = (perf_counter() - started) / len(queries) * 1000
+        return elapsed, found / len(queries)
+
+    def orm_match(self, ingredient_ids, missing):
+        return list(Recipe.objects.annotate(
+            size=Count('recipe_ingredient'),
+            covered=Count(
+                'recipe_ingredient',
+                filter=Q(recipe_ingredient__ingredient__in=ingredient_ids)
+            )
+        ).filter(
+            covered__gt=0, size__lte=F('covered') + missing
+        ).annotate(
+            coverage=Cast('covered', FloatField()) / F('size')
+        ).order_by('-coverage', '-id').values_list('id', flat=True))
+
+    def insert(self, rows, recipes, ingredients):
+        """Вставка синтетического каталога, id совпадают с индексом"""
+
+        author = User.objects.create(
+            username='bench-recipe-match', email='bench@example.com'
+        )
+        ingredient_ids = Ingredient.objects.bulk_create(
+            Ingredient(name=f'bench-{number}', measurement_unit='г')
+            for number in range(ingredients)
+        )
+        recipe_ids = Recipe.objects.bulk_create(
+            (Recipe(
+                author=author, name=f'bench-{number}', text='-',
+                image='recipes/images/bench.png', cooking_time=1
+            ) for number in range(recipes)),
+            batch_size=1000
+        )
+        ingredient_ids = [None] + [item.id for item in ingredient_ids]
+        recipe_ids = [None] + [item.id for item in recipe_ids]
+        RecipeIngredient.objects.bulk_create(
+            (RecipeIngredient(
+                recipe_id=recipe_ids[recipe_id],
+                ingredient_id=ingredient_ids[ingredient_id],
+                amount=1
+            ) for recipe_id, ingredient_id in rows),
+            batch_size=5000
+        )
+        return ingredient_ids
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        rows, population, weights = self.catalogue(
+            options['recipes'], options['ingredients']
+        )
+        started = perf_counter()
+        postings, recipes = build(rows)
+        self.stdout.write(
+            f'Рецептов: {len(recipes)}, строк состава: {len(rows)}, '
+            f'построение индекса: {perf_counter() - started:.2f} с'
+        )
+        # "холодильник" из 5-15 ингредиентов
+        queries = [
+            sorted(set(random.choices(
+                population, weights, k=random.randint(5, 15)
+            )))
+            for _ in range(options['queries'])
+        ]
+        for missing in (0, 1, 2):
+            elapsed, found = self.measure(
+                lambda query, k: rank(postings, recipes, query, k),
+                queries, missing
+            )
+            self.stdout.write(
+                f'Индекс, missing={missing}: {elapsed:.2f} мс на запрос, '
+                f'в среднем найдено {found:.0f}'
+            )
+        if not options['sql']:
+            return
+
+        try:
+            with transaction.atomic():
+                ingredient_ids = self.insert(
+                    rows, options['recipes'], options['ingredients']
+                )
+                sql_queries = [
+                    [ingredient_ids[number] for number in query]
+                    for query in queries
+                ]
+                for missing in (0, 1, 2):
+                    elapsed, found = self.measure(
+                        self.orm_match, sql_queries, missing
+                    )
+                    self.stdout.write(
+                        f'ORM, missing={missing}: {elapsed:.2f} мс '
+                        f'на запрос, в среднем найдено {found:.0f}'
+                    )
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    ShoppingCart,
+    shopping_list_by_unit
+)
+from api.views import RecipeViewSet, UserViewSet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Вывод планов выполнения основных запросов API. '
+            'Для сравнения запускается до и после миграций с индексами')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, default=None,
+            help='id пользователя, от имени которого строятся запросы'
+        )
+        parser.add_argument(
+            '--prefix', default='а',
+            help='Префикс для поиска ингредиентов'
+        )
+
+    def get_request(self, user, **params):
+        request = Request(APIRequestFactory().get('/', params))
+        request.user = user
+        return request
+
+    def get_queries(self, user, prefix):
+        recipes = RecipeViewSet(request=self.get_request(user))
+        authors = UserViewSet(request=self.get_request(user))
+        feed = recipes.get_queryset()
+        return {
+            'RecipeViewSet.list': feed[:6],
+            'RecipeViewSet.list?author': feed.filter(author=user)[:6],
+            'RecipeViewSet.list?is_favorited': feed.filter(
+                favorites__user=user)[:6],
+            'RecipeViewSet.list?is_in_shopping_cart': feed.filter(
+                shopping_carts__user=user)[:6],
+            'IngredientViewSet.list?name': Ingredient.objects.filter(
+                name__istartswith=prefix),
+            'UserViewSet.subscriptions': authors.get_authors_with_recipes(
+                self.get_request(user, recipes_limit=3)
+            ).filter(authors__subscriber=user)[:6],
+            'Favorite by user': Favorite.objects.filter(user=user),
+            'ShoppingCart by user': ShoppingCart.objects.filter(user=user),
+            'RecipeViewSet.download_shopping_cart': shopping_list_by_unit(
+                user.shopping_list.all()
+            ),
+        }
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['user'] is not None:
+            users = users.filter(pk=options['user'])
+        user = users.first()
+        if user is None:
+            raise CommandError('Нет пользователя для построения запросов.')
+
+        analyze = connection.vendor == 'postgresql'
+        for name, queryset in self.get_queries(
+            user, options['prefix']
+        ).items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(
+                queryset.explain(analyze=True) if analyze
+                else queryset.explain()
+            )
+            self.stdout.write('')
@@ -0,0 +1,102 @@
+import asyncio
+from time import perf_counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест GET-запросами к запущенному серверу. '
+            'Параметр --slow имитирует медленных клиентов, '
+            'отправляющих заголовки запроса с задержкой')
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='Адреса для запросов')
+        parser.add_argument(
+            '--concurrency', type=int, default=50,
+            help='Количество одновременных клиентов'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=20,
+            help='Длительность теста в секундах'
+        )
+        parser.add_argument(
+            '--slow', type=float, default=0,
+            help='Задержка клиента между строками заголовков в секундах'
+        )
+        parser.add_argument(
+            '--token', default=None, help='Токен для заголовка Authorization'
+        )
+
+    async def request(self, url, slow, token):
+        parts = urlsplit(url)
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, parts.port or 80
+        )
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        lines = [
+            f'GET {path} HTTP/1.1',
+            f'Host: {parts.netloc}',
+            'Accept: application/json',
+            'Connection: close',
+        ]
+        if token:
+            lines.append(f'Authorization: Token {token}')
+        try:
+            for line in lines:
+                writer.write(f'{line}\r\n'.encode())
+                await writer.drain()
+                if slow:
+                    await asyncio.sleep(slow)
+            writer.write(b'\r\n')
+            await writer.drain()
+            status = (await reader.readline()).split()[1]
+            await reader.read()
+            return int(status)
+        finally:
+            writer.close()
+
+    async def client(self, urls, deadline, options, results):
+        number = 0
+        while perf_counter() < deadline:
+            url = urls[number % len(urls)]
+            number += 1
+            started = perf_counter()
+            try:
+                status = await self.request(
+                    url, options['slow'], options['token']
+                )
+            except (OSError, IndexError, ValueError):
+                status = None
+            results.append((status, perf_counter() - started))
+
+    async def run(self, options):
+        results = []
+        deadline = perf_counter() + options['duration']
+        await asyncio.gather(*(
+            self.client(options['urls'], deadline, options, results)
+            for _ in range(options['concurrency'])
+        ))
+        return results
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        results = asyncio.run(self.run(options))
+        elapsed = perf_counter() - started
+        if not results:
+            raise CommandError('Не выполнено ни одного запроса.')
+
+        latencies = sorted(
+            latency for status, latency in results if status == 200
+        )
+        errors = len(results) - len(latencies)
+        self.stdout.write(
+            f'Запросов: {len(results)}, ошибок: {errors}, '
+            f'RPS: {len(latencies) / elapsed:.1f}'
+        )
+        if latencies:
+            percentiles = ', '.join(
+                f'p{p}={latencies[int(len(latencies) * p / 100)] * 1000:.0f}'
+                for p in (50, 95, 99)
+            )
+            self.stdout.write(f'Задержка, мс: {percentiles}')
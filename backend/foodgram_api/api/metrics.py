@@ -0,0 +1,129 @@
+import threading
+from collections import defaultdict
+from time import perf_counter
+
+# границы корзин гистограмм
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (
+    1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024
+)
+
+# сколько одинаковых запросов за запрос к API считается признаком N+1
+DUPLICATE_QUERIES_THRESHOLD = 5
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus с метками по представлению"""
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.values = defaultdict(lambda: [[0] * len(buckets), 0, 0])
+
+    def observe(self, view, value):
+        counts, total, count = self.values[view]
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[position] += 1
+        self.values[view] = [counts, total + value, count + 1]
+
+    def render(self):
+        yield f'# HELP {self.name} {self.description}'
+        yield f'# TYPE {self.name} histogram'
+        for view, (counts, total, count) in sorted(self.values.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                yield (f'{self.name}_bucket{{view="{view}",le="{bound}"}} '
+                       f'{bucket_count}')
+            yield f'{self.name}_bucket{{view="{view}",le="+Inf"}} {count}'
+            yield f'{self.name}_sum{{view="{view}"}} {total}'
+            yield f'{self.name}_count{{view="{view}"}} {count}'
+
+
+class Counter:
+    """Счетчик в формате Prometheus с метками по представлению"""
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.values = defaultdict(int)
+
+    def observe(self, view, value):
+        self.values[view] += value
+
+    def render(self):
+        yield f'# HELP {self.name} {self.description}'
+        yield f'# TYPE {self.name} counter'
+        for view, value in sorted(self.values.items()):
+            yield f'{self.name}{{view="{view}"}} {value}'
+
+
+class Registry:
+    """Метрики запросов к API, накапливаемые в памяти процесса"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.metrics = {
+            'duration': Histogram(
+                'foodgram_request_duration_seconds',
+                'Время обработки запроса', DURATION_BUCKETS),
+            'queries': Histogram(
+                'foodgram_db_queries',
+                'Количество SQL-запросов на запрос', QUERIES_BUCKETS),
+            'db_duration': Histogram(
+                'foodgram_db_duration_seconds',
+                'Суммарное время SQL-запросов', DURATION_BUCKETS),
+            'serialize_duration': Histogram(
+                'foodgram_serialize_duration_seconds',
+                'Время обработчика без SQL (сериализация)',
+                DURATION_BUCKETS),
+            'response_size': Histogram(
+                'foodgram_response_size_bytes',
+                'Размер ответа', SIZE_BUCKETS),
+            'duplicate_queries': Counter(
+                'foodgram_duplicate_queries_total',
+                'Запросы с повторяющимся SQL, вероятные N+1'),
+        }
+
+    def observe(self, view, **values):
+        with self._lock:
+            for name, value in values.items():
+                if value is not None:
+                    self.metrics[name].observe(view, value)
+
+    def render(self):
+        with self._lock:
+            return '\n'.join(
+                line for metric in self.metrics.values()
+                for line in metric.render()
+            ) + '\n'
+
+
+registry = Registry()
+
+
+class QueryStats:
+    """Обертка выполнения SQL, считающая запросы текущего запроса"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = defaultdict(int)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def duplicates(self):
+        return {
+            sql: count for sql, count in self.statements.items()
+            if count >= DUPLICATE_QUERIES_THRESHOLD
+        }
@@ -0,0 +1,85 @@
+import logging
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connection
+
+from .metrics import QueryStats, registry
+
+logger = logging.getLogger(__name__)
+
+
+class QueryMetricsMiddleware:
+    """Учет количества и времени SQL-запросов, времени обработки
+    и размера ответа для каждого запроса.
+
+    Значения отдаются в заголовке Server-Timing и накапливаются
+    в гистограммах, доступных по /api/metrics/.
+
+    В режиме ASGI запросы к БД выполняются в отдельных потоках,
+    поэтому учитываются только время обработки и размер ответа."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        request.query_stats = stats
+        started = perf_counter()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        return self.observe(request, response, started, stats)
+
+    async def __acall__(self, request):
+        started = perf_counter()
+        response = await self.get_response(request)
+        return self.observe(request, response, started)
+
+    def observe(self, request, response, started, stats=None):
+        duration = perf_counter() - started
+        view = self.get_view_name(request)
+        size = None if response.streaming else len(response.content)
+        serialize_duration = getattr(request, 'serialize_duration', None)
+        duplicates = stats.duplicates() if stats else {}
+        for sql, count in duplicates.items():
+            logger.warning(
+                'Вероятный N+1 в %s: %s повторов запроса %s',
+                view, count, sql
+            )
+
+        registry.observe(
+            view,
+            duration=duration,
+            queries=stats.count if stats else None,
+            db_duration=stats.duration if stats else None,
+            serialize_duration=serialize_duration,
+            response_size=size,
+            duplicate_queries=sum(duplicates.values()) if stats else None,
+        )
+
+        timings = []
+        if stats is not None:
+            timings.append(
+                f'db;dur={stats.duration * 1000:.1f};'
+                f'desc="{stats.count} queries"'
+            )
+        if serialize_duration is not None:
+            timings.append(f'serialize;dur={serialize_duration * 1000:.1f}')
+        timings.append(f'total;dur={duration * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(timings)
+        return response
+
+    def get_view_name(self, request):
+        view = getattr(request, 'metrics_view', None)
+        if view:
+            return view
+        if request.resolver_match is None:
+            return 'unresolved'
+        return request.resolver_match.view_name or 'unknown'
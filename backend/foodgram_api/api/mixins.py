@@ -0,0 +1,26 @@
+from time import perf_counter
+
+
+class MetricsMixin:
+    """Передает в QueryMetricsMiddleware имя действия вьюсета
+    и время работы обработчика без учета SQL-запросов"""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        stats = getattr(request._request, 'query_stats', None)
+        self.metrics_started = perf_counter()
+        self.metrics_db_duration = stats.duration if stats else 0.0
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        django_request = getattr(request, '_request', request)
+        action = getattr(self, 'action', None) or request.method.lower()
+        django_request.metrics_view = f'{type(self).__name__}.{action}'
+
+        stats = getattr(django_request, 'query_stats', None)
+        started = getattr(self, 'metrics_started', None)
+        if stats is not None and started is not None:
+            db_duration = stats.duration - self.metrics_db_duration
+            django_request.serialize_duration = max(
+                perf_counter() - started - db_duration, 0.0
+            )
+        return super().finalize_response(request, response, *args, **kwargs)
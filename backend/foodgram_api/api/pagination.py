@@ -1,4 +1,18 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .consts import RECIPES_COUNT_CACHE_TIMEOUT
 
 
 class PageLimitPagination(PageNumberPagination):
@@ -7,3 +21,118 @@ class PageLimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     max_page_size = 100
     page_query_param = 'page'
+
+
+class RecipeCursorPagination(BasePagination):
+    """Пагинация ленты рецептов по курсору (pub_date, id).
+
+    Страница выбирается условием по ключу сортировки вместо OFFSET,
+    поэтому время ответа не зависит от глубины прокрутки.
+    Общее количество по умолчанию не считается, параметр count
+    позволяет получить его из кэша (cached) или оценку
+    планировщика PostgreSQL (estimated)."""
+
+    page_size = PageLimitPagination.page_size
+    page_size_query_param = PageLimitPagination.page_size_query_param
+    max_page_size = PageLimitPagination.max_page_size
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def get_page_size(self, request):
+        return PageLimitPagination().get_page_size(request)
+
+    def encode_cursor(self, recipe):
+        position = json.dumps([recipe.pub_date.isoformat(), recipe.id])
+        return urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            pub_date, pk = json.loads(urlsafe_b64decode(cursor.encode()))
+            pub_date = parse_datetime(pub_date)
+            if pub_date is None:
+                raise ValueError
+            return pub_date, int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.count = self.get_count(queryset, request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'estimated' and connection.vendor == 'postgresql':
+            plan = json.loads(queryset.order_by().explain(format='json'))
+            return plan[0]['Plan']['Plan Rows']
+        if mode in ('cached', 'estimated'):
+            params = request.query_params.copy()
+            for param in (self.cursor_query_param, self.count_query_param,
+                          self.page_size_query_param):
+                params.pop(param, None)
+            key = 'recipes-count:{}:{}'.format(
+                request.user.pk,
+                hashlib.md5(params.urlencode().encode()).hexdigest()
+            )
+            return cache.get_or_set(
+                key, queryset.count, RECIPES_COUNT_CACHE_TIMEOUT
+            )
+        return None
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
+
+
+class RecipePagination(PageLimitPagination):
+    """Постраничная пагинация ленты рецептов. При наличии
+    параметра cursor (в том числе пустого) включается пагинация
+    по курсору. Курсор хранит позицию в порядке (pub_date, id),
+    поэтому выборки с другой сортировкой (поиск по релевантности)
+    разбиваются на страницы по номеру"""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (
+            RecipeCursorPagination.cursor_query_param in request.query_params
+            and not queryset.query.order_by
+        ):
+            self.cursor_pagination = RecipeCursorPagination()
+            return self.cursor_pagination.paginate_queryset(
+                queryset, request, view
+            )
+        self.cursor_pagination = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,83 @@
+import codecs
+import re
+import uuid
+
+from django.conf import settings
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import json
+
+from .fields import decode_base64_image
+
+# значение поля с изображением в виде data URI в теле запроса
+FILE_VALUE = re.compile(
+    rb'(?<!\\)("(?:image|avatar)")\s*:\s*"data:[\w/.+-]*;base64,'
+)
+
+
+class Base64JSONParser(JSONParser):
+    """JSON-парсер, декодирующий изображения в data URI прямо из байтов
+    тела запроса.
+
+    Строка base64 не создается: ее участок в теле декодируется порциями
+    во временный файл и заменяется меткой, а после разбора JSON метка
+    заменяется на файл. Так в памяти остается одна копия тела запроса
+    вместо тела, строки, декодированных байтов и их копий."""
+
+    def extract_files(self, body):
+        """Тело запроса без изображений и словарь {метка: файл}"""
+
+        uploads = {}
+        parts = []
+        position = 0
+        for match in FILE_VALUE.finditer(body):
+            start = match.end()
+            end = body.find(b'"', start)
+            # экранированные символы в base64 не встречаются,
+            # такие значения разбираются обычным образом
+            if end == -1 or body.find(b'\\', start, end) != -1:
+                continue
+            try:
+                upload = decode_base64_image(body, start, end)
+            except ValueError:
+                # ошибку вернет поле сериализатора
+                continue
+            if upload is None:
+                continue
+            label = str(uuid.uuid4())
+            uploads[label] = upload
+            parts += [
+                body[position:match.start()],
+                match.group(1),
+                b':"%s"' % label.encode()
+            ]
+            position = end + 1
+        if not uploads:
+            return body, uploads
+        parts.append(body[position:])
+        return b''.join(parts), uploads
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        body, uploads = self.extract_files(stream.read())
+
+        def restore_files(obj):
+            for key, value in obj.items():
+                if isinstance(value, str) and value in uploads:
+                    obj[key] = uploads.pop(value)
+            return obj
+
+        try:
+            parse_constant = json.strict_constant if self.strict else None
+            return json.loads(
+                body,
+                parse_constant=parse_constant,
+                object_hook=restore_files if uploads else None
+            )
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
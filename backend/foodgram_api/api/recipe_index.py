@@ -0,0 +1,164 @@
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.models import ChangeCounter, RecipeIngredient
+from .cache import RECIPE_INGREDIENTS_VERSION
+from .consts import RECIPE_INDEX_JOURNAL_SIZE, RECIPE_INDEX_JOURNAL_TIMEOUT
+
+
+def journal_key(version):
+    return f'recipe-index:change:{version}'
+
+
+def build(rows):
+    """Массивы рецептов по ингредиентам и ингредиенты рецептов
+    из пар (id рецепта, id ингредиента), упорядоченных по id рецепта"""
+
+    postings = defaultdict(lambda: array('I'))
+    recipes = defaultdict(list)
+    for recipe_id, ingredient_id in rows:
+        postings[ingredient_id].append(recipe_id)
+        recipes[recipe_id].append(ingredient_id)
+    return dict(postings), {
+        recipe_id: tuple(ingredients)
+        for recipe_id, ingredients in recipes.items()
+    }
+
+
+def rank(postings, recipes, ingredient_ids, missing=0):
+    """Рецепты, для которых из ingredient_ids не хватает не более
+    missing ингредиентов.
+
+    Возвращает пары (id рецепта, недостающих ингредиентов),
+    упорядоченные по доле имеющихся ингредиентов рецепта,
+    затем по числу недостающих и от новых рецептов к старым."""
+
+    covered = Counter()
+    for ingredient_id in set(ingredient_ids):
+        covered.update(postings.get(ingredient_id, ()))
+    found = []
+    for recipe_id, count in covered.items():
+        size = len(recipes.get(recipe_id, ()))
+        if size and size - count <= missing:
+            found.append((count / size, size - count, recipe_id))
+    found.sort(key=lambda item: (-item[0], item[1], -item[2]))
+    return [(recipe_id, lacking) for _, lacking, recipe_id in found]
+
+
+class RecipeIndex:
+    """Обратный индекс ингредиент -> рецепты в памяти процесса
+    для подбора рецептов по имеющимся ингредиентам.
+
+    Для каждого ингредиента хранится отсортированный массив id
+    рецептов, для каждого рецепта - его ингредиенты. Изменения
+    рецептов применяются к индексу точечно: каждое изменение
+    получает номер от счетчика в БД и записывается в журнал в общем
+    кэше, откуда его забирают остальные процессы. Счетчик в кэше
+    не подходит: в файловом кэше incr не атомарен, и два изменения
+    с одним номером затерли бы друг друга в журнале. Если записей
+    журнала не хватает, индекс строится заново."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        # массивы рецептов по ингредиентам и ингредиенты рецептов
+        self._postings = {}
+        self._recipes = {}
+
+    def _build(self, version):
+        self._postings, self._recipes = build(
+            RecipeIngredient.objects.order_by('recipe_id').values_list(
+                'recipe_id', 'ingredient_id'
+            ).iterator(chunk_size=10000)
+        )
+        self._version = version
+
+    def _apply(self, recipe_id, ingredient_ids):
+        """Замена ингредиентов рецепта, None - рецепт удален.
+
+        Измененные массивы копируются, чтобы не менять массив,
+        который в этот момент читает другой поток."""
+
+        old = set(self._recipes.pop(recipe_id, ()))
+        new = set(ingredient_ids or ())
+        for ingredient_id in old - new:
+            recipes = array('I', self._postings.get(ingredient_id, ()))
+            position = bisect_left(recipes, recipe_id)
+            if position < len(recipes) and recipes[position] == recipe_id:
+                del recipes[position]
+            self._postings[ingredient_id] = recipes
+        for ingredient_id in new - old:
+            recipes = array('I', self._postings.get(ingredient_id, ()))
+            insort(recipes, recipe_id)
+            self._postings[ingredient_id] = recipes
+        if new:
+            self._recipes[recipe_id] = tuple(new)
+
+    def _replay(self, version):
+        """Применение журнала изменений от текущей версии до version.
+
+        False, если часть записей уже вытеснена из кэша."""
+
+        if version - self._version > RECIPE_INDEX_JOURNAL_SIZE:
+            return False
+        keys = [
+            journal_key(number)
+            for number in range(self._version + 1, version + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return False
+        for key in keys:
+            self._apply(*changes[key])
+        self._version = version
+        return True
+
+    def _actualize(self):
+        version = ChangeCounter.current(RECIPE_INGREDIENTS_VERSION)
+        if version != self._version:
+            with self._lock:
+                if version != self._version and not (
+                    self._version is not None
+                    and version > self._version
+                    and self._replay(version)
+                ):
+                    self._build(version)
+        return self._postings, self._recipes
+
+    def recipe_changed(self, recipe_id, ingredient_ids):
+        """Запись изменения ингредиентов рецепта (None - рецепт удален)
+        в журнал после фиксации транзакции"""
+
+        ingredient_ids = (
+            None if ingredient_ids is None else sorted(set(ingredient_ids))
+        )
+
+        def publish():
+            version = ChangeCounter.increment(RECIPE_INGREDIENTS_VERSION)
+            cache.set(
+                journal_key(version),
+                (recipe_id, ingredient_ids),
+                RECIPE_INDEX_JOURNAL_TIMEOUT
+            )
+        transaction.on_commit(publish)
+
+    def reset(self):
+        """Полное перестроение индекса во всех процессах: для нового
+        номера нет записи журнала"""
+
+        transaction.on_commit(
+            lambda: ChangeCounter.increment(RECIPE_INGREDIENTS_VERSION)
+        )
+
+    def match(self, ingredient_ids, missing=0):
+        """Подбор рецептов по ингредиентам, см. rank"""
+
+        return rank(*self._actualize(), ingredient_ids, missing)
+
+
+recipe_index = RecipeIndex()
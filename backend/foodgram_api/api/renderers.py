@@ -0,0 +1,51 @@
+import json
+
+from django.http import Http404
+
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer
+
+
+class FormatContentNegotiation(DefaultContentNegotiation):
+    """Выбор рендерера только по параметру format без учета
+    заголовка Accept. Без параметра выбирается первый рендерер"""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        format_query = format_suffix or request.query_params.get(
+            self.settings.URL_FORMAT_OVERRIDE
+        )
+        if not format_query:
+            return renderers[0], renderers[0].media_type
+        for renderer in renderers:
+            if renderer.format == format_query:
+                return renderer, renderer.media_type
+        raise Http404
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Рендерер для выбора формата списка покупок параметром format.
+
+    Содержимое списка отдается потоково в обход рендерера,
+    через него проходят только ответы с ошибками."""
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class PlainTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
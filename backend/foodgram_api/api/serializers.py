@@ -1,18 +1,29 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 
 from rest_framework import serializers
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 
-from drf_extra_fields.fields import Base64ImageField
-
 from users.models import Follow
-from recipes.models import Ingredient, RecipeIngredient, Recipe
+from recipes.models import (
+    Ingredient,
+    RecipeIngredient,
+    Recipe,
+    change_shopping_lists
+)
+from recipes.tasks import process_recipe_image
+from tasks.queue import enqueue
 from .consts import (
     MIN_INGREDIENT_VALUE,
     MAX_INGREDIENT_VALUE,
     MIN_COOKING_TIME,
-    MAX_COOKING_TIME
+    MAX_COOKING_TIME,
+    MAX_BULK_RECIPES,
+    MAX_MISSING_INGREDIENTS
 )
+from .fields import ImageField, ImageVariantsField
+from .recipe_index import recipe_index
 
 User = get_user_model()
 
@@ -21,7 +32,7 @@ class CustomUserSerializer(DjoserUserSerializer):
     """Сериализатор пользователя"""
 
     is_subscribed = serializers.SerializerMethodField()
-    avatar = Base64ImageField(required=False, allow_null=True)
+    avatar = ImageField(required=False, allow_null=True)
 
     class Meta:
         model = User
@@ -36,7 +47,10 @@ class CustomUserSerializer(DjoserUserSerializer):
         )
 
     def get_is_subscribed(self, user):
-        request = self.context['request']
+        is_subscribed = getattr(user, 'is_subscribed', None)
+        if is_subscribed is not None:
+            return is_subscribed
+        request = self.context.get('request')
         return (
             request
             and request.user.is_authenticated
@@ -71,13 +85,58 @@ class ReadRecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount')
 
 
+class IngredientIdField(serializers.IntegerField):
+    """id ингредиента. Существование проверяется в списке, а ошибки
+    типа совпадают с ошибками PrimaryKeyRelatedField"""
+
+    default_error_messages = {
+        'incorrect_type': serializers.PrimaryKeyRelatedField
+        .default_error_messages['incorrect_type'],
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, bool):
+            try:
+                return super().to_internal_value(data)
+            except serializers.ValidationError:
+                pass
+        self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class CreateRecipeIngredientListSerializer(serializers.ListSerializer):
+    """Список ингредиентов рецепта. Ингредиенты по всем полученным id
+    загружаются из БД одним запросом: каталог в памяти процесса может
+    отставать от нее, и рецепт получил бы удаленный ингредиент"""
+
+    default_error_messages = {
+        'does_not_exist': serializers.PrimaryKeyRelatedField
+        .default_error_messages['does_not_exist'],
+    }
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        ingredients = Ingredient.objects.in_bulk(
+            {item['ingredient'] for item in items}
+        )
+        errors = [{} for _ in items]
+        for item, error in zip(items, errors):
+            pk = item['ingredient']
+            if pk not in ingredients:
+                error['id'] = [self.error_messages['does_not_exist'].format(
+                    pk_value=pk
+                )]
+                continue
+            item['ingredient'] = ingredients[pk]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
+
+
 class CreateRecipeIngredientSerializer(serializers.ModelSerializer):
     """Сериализатор связи рецепт-ингридиент при создании/изменении"""
 
-    id = serializers.PrimaryKeyRelatedField(
-        source='ingredient',
-        queryset=Ingredient.objects.all()
-    )
+    # id проверяется по БД в CreateRecipeIngredientListSerializer
+    id = IngredientIdField(source='ingredient')
     amount = serializers.IntegerField(
         min_value=MIN_INGREDIENT_VALUE,
         max_value=MAX_INGREDIENT_VALUE
@@ -86,6 +145,7 @@ class CreateRecipeIngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
+        list_serializer_class = CreateRecipeIngredientListSerializer
 
 
 class ReadRecipeSerializer(serializers.ModelSerializer):
@@ -98,6 +158,7 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    images = ImageVariantsField(source='image_variants')
 
     class Meta:
         model = Recipe
@@ -109,11 +170,23 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'images',
+            'image_status',
             'text',
             'cooking_time',
         )
 
+    def to_representation(self, recipe):
+        # флаг подписки на автора приходит аннотацией рецепта
+        is_author_subscribed = getattr(recipe, 'is_author_subscribed', None)
+        if is_author_subscribed is not None:
+            recipe.author.is_subscribed = is_author_subscribed
+        return super().to_representation(recipe)
+
     def get_is_favorited(self, recipe):
+        is_favorited = getattr(recipe, 'is_favorited', None)
+        if is_favorited is not None:
+            return is_favorited
         request = self.context.get('request')
         return (
             request
@@ -122,6 +195,9 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, recipe):
+        is_in_shopping_cart = getattr(recipe, 'is_in_shopping_cart', None)
+        if is_in_shopping_cart is not None:
+            return is_in_shopping_cart
         request = self.context.get('request')
         return (
             request
@@ -130,13 +206,22 @@ class ReadRecipeSerializer(serializers.ModelSerializer):
         )
 
 
+class MatchedRecipeSerializer(ReadRecipeSerializer):
+    """Сериализатор рецептов, подобранных по ингредиентам"""
+
+    missing = serializers.IntegerField(read_only=True)
+
+    class Meta(ReadRecipeSerializer.Meta):
+        fields = ReadRecipeSerializer.Meta.fields + ('missing', )
+
+
 class CreateRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор рецептов при создании/изменении"""
 
     ingredients = CreateRecipeIngredientSerializer(
         source='recipe_ingredient', many=True,
     )
-    image = Base64ImageField(allow_null=False)
+    image = ImageField(allow_null=False)
     cooking_time = serializers.IntegerField(
         min_value=MIN_COOKING_TIME,
         max_value=MAX_COOKING_TIME
@@ -175,34 +260,172 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             )
             for ingredient in ingredients
         )
+        recipe_index.recipe_changed(
+            recipe.id,
+            [ingredient['ingredient'].id for ingredient in ingredients]
+        )
+
+    def process_image(self, recipe):
+        """Постановка обработки изображения в фоновую очередь"""
+
+        enqueue(process_recipe_image, recipe.pk, recipe.image.name)
+        # при синхронном выполнении задача уже обновила рецепт
+        recipe.refresh_from_db(
+            fields=('image', 'image_variants', 'image_status')
+        )
 
     def create(self, validated_data):
         ingredients_data = validated_data.pop('recipe_ingredient')
+        validated_data['image_status'] = Recipe.IMAGE_PENDING
         recipe = super().create(validated_data)
         self.set_recipe_ingredients(recipe, ingredients_data)
+        self.process_image(recipe)
+        # новый рецепт еще не в избранном и корзине, на себя
+        # автор подписаться не может: флаги ответа известны без запросов
+        recipe.is_favorited = False
+        recipe.is_in_shopping_cart = False
+        recipe.is_author_subscribed = False
         return recipe
 
+    def update_recipe_ingredients(self, recipe, ingredients):
+        """Применение разницы между текущим и новым составом:
+        удаление, изменение количеств и вставка не более чем тремя
+        запросами. True, если состав изменился"""
+
+        amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        existing = {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(
+                recipe=recipe
+            ).order_by().only('id', 'ingredient_id', 'amount')
+        }
+        removed = existing.keys() - amounts.keys()
+        changed = [
+            row for ingredient_id, row in existing.items()
+            if amounts.get(ingredient_id, row.amount) != row.amount
+        ]
+        added = [
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        ]
+        if not (removed or changed or added):
+            return False
+
+        # списки покупок пересчитываются по новому составу рецепта
+        carts = recipe.shopping_carts.all()
+        change_shopping_lists(carts, -1)
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        if changed:
+            for row in changed:
+                row.amount = amounts[row.ingredient_id]
+            RecipeIngredient.objects.bulk_update(changed, ('amount', ))
+        if added:
+            RecipeIngredient.objects.bulk_create(added)
+        change_shopping_lists(carts)
+        if removed or added:
+            recipe_index.recipe_changed(recipe.id, list(amounts))
+        return True
+
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop('recipe_ingredient', None)
         ingredients_data = self.validate_ingredients(ingredients_data)
-        instance.recipe_ingredient.all().delete()
-        self.set_recipe_ingredients(instance, ingredients_data)
-        return super().update(instance, validated_data)
+        if 'image' in validated_data:
+            validated_data['image_status'] = Recipe.IMAGE_PENDING
+        # новое изображение сохраняется всегда, остальные поля - если
+        # значение изменилось
+        fields = [
+            field for field, value in validated_data.items()
+            if field == 'image' or getattr(instance, field) != value
+        ]
+        with transaction.atomic():
+            # параллельные изменения рецепта применяются по очереди
+            Recipe.objects.select_for_update().filter(
+                pk=instance.pk
+            ).exists()
+            ingredients_changed = self.update_recipe_ingredients(
+                instance, ingredients_data
+            )
+            if fields or ingredients_changed:
+                for field in fields:
+                    setattr(instance, field, validated_data[field])
+                instance.save(update_fields=(*fields, 'updated_at'))
+        if 'image' in validated_data:
+            self.process_image(instance)
+        return instance
 
     def to_representation(self, instance):
+        # ингредиенты рецепта читаются одним запросом вместе с названиями
+        prefetch_related_objects([instance], Prefetch(
+            'recipe_ingredient',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        ))
         return ReadRecipeSerializer(
             instance, context={'request': self.context.get('request')}).data
 
 
+class RecipeMatchQuerySerializer(serializers.Serializer):
+    """Параметры подбора рецептов по ингредиентам"""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+    missing = serializers.IntegerField(
+        min_value=0, max_value=MAX_MISSING_INGREDIENTS, default=0
+    )
+
+    def to_internal_value(self, data):
+        # id ингредиентов передаются через запятую или повтором параметра
+        ingredients = [
+            value
+            for values in data.getlist('ingredients')
+            for value in values.split(',')
+            if value
+        ]
+        return super().to_internal_value({
+            'ingredients': ingredients,
+            'missing': data.get('missing', 0),
+        })
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для пакетного добавления/удаления"""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_RECIPES
+    )
+
+
+class ShoppingListTotalSerializer(serializers.Serializer):
+    """Сериализатор суммарного количества ингредиента в корзине"""
+
+    name = serializers.CharField()
+    measurement_unit = serializers.CharField(source='unit')
+    amount = serializers.IntegerField()
+
+
 class ShortRecipeSerializer(serializers.ModelSerializer):
     """Короткий сериализатор рецептов"""
 
+    images = ImageVariantsField(source='image_variants')
+
     class Meta:
         model = Recipe
         fields = (
             'id',
             'name',
             'image',
+            'images',
             'cooking_time'
         )
         read_only_fields = fields
@@ -212,10 +435,7 @@ class UserRecipesSerializer(CustomUserSerializer):
     """Сериализатор рецептов у пользователей"""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(
-        source='recipes.count',
-        read_only=True
-    )
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -233,11 +453,12 @@ class UserRecipesSerializer(CustomUserSerializer):
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        recipes = obj.recipes.all()
-        recipes_limit = request.query_params.get('recipes_limit')
-
-        if recipes_limit and recipes_limit.isdigit():
-            recipes = recipes[:int(recipes_limit)]
+        recipes = getattr(obj, 'limited_recipes', None)
+        if recipes is None:
+            recipes = obj.recipes.all()
+            recipes_limit = request.query_params.get('recipes_limit')
+            if recipes_limit and recipes_limit.isdigit():
+                recipes = recipes[:int(recipes_limit)]
 
         return ShortRecipeSerializer(
             recipes, context={"request": request}, many=True).data
@@ -0,0 +1,151 @@
+import csv
+import json
+import os
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+# размер пачки строк, забираемых из БД итератором
+CHUNK_SIZE = 500
+# объем PDF, который держится в памяти до сброса во временный файл
+PDF_SPOOL_SIZE = 1024 * 1024
+PDF_FONT_NAME = 'ShoppingListFont'
+PDF_FONT_SIZE = 11
+PDF_LINE_HEIGHT = 16
+PDF_MARGIN = 50
+
+
+def take(iterator, size):
+    return list(islice(iterator, size))
+
+
+async def aiterate(iterator, size=CHUNK_SIZE):
+    """Асинхронный обход выгрузки для режима ASGI.
+
+    Синхронный итератор ответа ASGI-обработчик Django вычитывает
+    целиком. Здесь части выгрузки забираются пачками в потоке
+    синхронного кода запроса, в котором открыт курсор БД"""
+
+    iterator = iter(iterator)
+    take_chunk = sync_to_async(take, thread_sensitive=True)
+    while chunk := await take_chunk(iterator, size):
+        for part in chunk:
+            yield part
+
+
+def ingredient_line(number, item):
+    return (f"{number}. {item['name']} — "
+            f"{item['amount']} {item['unit']}")
+
+
+def export_txt(user, recipes, ingredients):
+    """Построчная выгрузка списка покупок в текстовом виде"""
+
+    yield f"Список покупок пользователя {user}\n"
+    yield "___________________________\n"
+    yield "Список рецептов:\n"
+    for recipe in recipes:
+        yield f"- {recipe}\n"
+    yield "\n"
+    yield "Список ингредиентов:\n"
+    for number, item in enumerate(ingredients, 1):
+        yield ingredient_line(number, item) + "\n"
+
+
+class Echo:
+    """Псевдобуфер, возвращающий записанную строку csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def export_csv(user, recipes, ingredients):
+    """Построчная выгрузка ингредиентов в CSV"""
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for item in ingredients:
+        yield writer.writerow((item['name'], item['unit'], item['amount']))
+
+
+def export_json(user, recipes, ingredients):
+    """Потоковая выгрузка списка покупок в JSON"""
+
+    yield '{"user": %s, "recipes": [' % json.dumps(
+        str(user), ensure_ascii=False)
+    for number, recipe in enumerate(recipes):
+        yield (', ' if number else '') + json.dumps(
+            recipe, ensure_ascii=False)
+    yield '], "ingredients": ['
+    for number, item in enumerate(ingredients):
+        yield (', ' if number else '') + json.dumps({
+            'name': item['name'],
+            'measurement_unit': item['unit'],
+            'amount': item['amount'],
+        }, ensure_ascii=False)
+    yield ']}'
+
+
+def get_pdf_font():
+    """Шрифт с кириллицей из настройки SHOPPING_LIST_PDF_FONT или None,
+    если файла шрифта нет. Встроенные шрифты PDF кириллицы
+    не содержат, и список покупок в них не читается"""
+
+    font_path = getattr(settings, 'SHOPPING_LIST_PDF_FONT', None)
+    if not font_path or not os.path.exists(font_path):
+        return None
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+    return PDF_FONT_NAME
+
+
+def export_pdf(user, recipes, ingredients):
+    """Выгрузка списка покупок в PDF.
+
+    PDF нельзя отдавать по мере формирования из-за таблицы ссылок
+    в конце файла, поэтому документ пишется во временный файл,
+    который затем отдается частями."""
+
+    font = get_pdf_font()
+    if font is None:
+        raise ImproperlyConfigured(
+            'Не найден шрифт SHOPPING_LIST_PDF_FONT для выгрузки в PDF'
+        )
+    with SpooledTemporaryFile(max_size=PDF_SPOOL_SIZE) as buffer:
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        position = height - PDF_MARGIN
+
+        def write_line(text):
+            nonlocal position
+            if position < PDF_MARGIN:
+                pdf.showPage()
+                position = height - PDF_MARGIN
+            pdf.setFont(font, PDF_FONT_SIZE)
+            pdf.drawString(PDF_MARGIN, position, text)
+            position -= PDF_LINE_HEIGHT
+
+        for line in export_txt(user, recipes, ingredients):
+            write_line(line.rstrip('\n'))
+        pdf.save()
+
+        buffer.seek(0)
+        while chunk := buffer.read(CHUNK_SIZE * 64):
+            yield chunk
+
+
+# формат: (content type, расширение файла, генератор содержимого)
+SHOPPING_LIST_FORMATS = {
+    'txt': ('text/plain', 'txt', export_txt),
+    'csv': ('text/csv', 'csv', export_csv),
+    'json': ('application/json', 'json', export_json),
+    'pdf': ('application/pdf', 'pdf', export_pdf),
+}
@@ -0,0 +1,221 @@
+import atexit
+import re
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+
+from recipes.models import Recipe
+from .cache import SHORT_LINKS_VERSION, aget_version, get_version
+from .consts import (
+    SHORT_LINK_CACHE_TIMEOUT,
+    SHORT_LINK_FLUSH_INTERVAL,
+    SHORT_LINK_FLUSH_SIZE,
+    SHORT_LINK_LRU_SIZE,
+    SHORT_LINK_LRU_TIMEOUT,
+    SHORT_LINK_MISSING_TIMEOUT,
+    SHORT_LINK_VERSION_INTERVAL
+)
+from .invalidation import invalidate
+
+SHORT_CODE = re.compile(r'[0-9a-zA-Z]{1,16}')
+# отметка несуществующего кода в кэше
+MISSING = 0
+
+
+class LRUCache:
+    """Кэш в памяти процесса с вытеснением давно не читанных
+    записей и временем жизни каждой записи"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value, expires = self._data.get(key, (None, 0))
+            if expires < monotonic():
+                self._data.pop(key, None)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (value, monotonic() + timeout)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class SharedVersion:
+    """Версия из общего кэша, которую процесс перечитывает
+    не чаще раза в interval секунд"""
+
+    def __init__(self, name, interval):
+        self.name = name
+        self.interval = interval
+        self.expire()
+
+    def _current(self):
+        version, checked = self._state
+        if monotonic() - checked < self.interval:
+            return version
+        return None
+
+    def expire(self):
+        """Перечитать версию при следующем обращении"""
+
+        self._state = (None, float('-inf'))
+
+    def get(self):
+        version = self._current()
+        if version is None:
+            version = get_version(self.name)
+            self._state = (version, monotonic())
+        return version
+
+    async def aget(self):
+        version = self._current()
+        if version is None:
+            version = await aget_version(self.name)
+            self._state = (version, monotonic())
+        return version
+
+
+class HitCounter:
+    """Переходы по коротким ссылкам, накапливаемые в памяти
+    до сброса в БД одним запросом"""
+
+    def __init__(self):
+        self._hits = {}
+        self._total = 0
+        self._flushed = monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, recipe_id):
+        """Учет перехода. True, если накопленное пора сбросить"""
+
+        with self._lock:
+            self._hits[recipe_id] = self._hits.get(recipe_id, 0) + 1
+            self._total += 1
+            return (
+                self._total >= SHORT_LINK_FLUSH_SIZE
+                or monotonic() - self._flushed >= SHORT_LINK_FLUSH_INTERVAL
+            )
+
+    def pop(self):
+        """Накопленные переходы в виде [[id рецепта, переходы], ...]"""
+
+        with self._lock:
+            hits, self._hits = self._hits, {}
+            self._total = 0
+            self._flushed = monotonic()
+        return [[recipe_id, count] for recipe_id, count in hits.items()]
+
+
+# записи кэша процесса сбрасываются сменой версии кодов,
+# поэтому ключом служит пара (версия, код)
+local_cache = LRUCache(SHORT_LINK_LRU_SIZE)
+links_version = SharedVersion(
+    SHORT_LINKS_VERSION, SHORT_LINK_VERSION_INTERVAL
+)
+link_hits = HitCounter()
+
+
+def cache_key(code):
+    return f'short-link:{code}'
+
+
+def timeout(recipe_id):
+    if recipe_id == MISSING:
+        return SHORT_LINK_MISSING_TIMEOUT
+    return SHORT_LINK_CACHE_TIMEOUT
+
+
+def local_timeout(recipe_id):
+    return min(timeout(recipe_id), SHORT_LINK_LRU_TIMEOUT)
+
+
+def resolve(code):
+    """id рецепта по коду короткой ссылки или None.
+
+    Код ищется в кэше процесса, затем в общем кэше и только потом
+    в БД. Несуществующие коды тоже кэшируются, на меньшее время."""
+
+    if not SHORT_CODE.fullmatch(code):
+        return None
+    local_key = (links_version.get(), code)
+    recipe_id = local_cache.get(local_key)
+    if recipe_id is None:
+        recipe_id = cache.get(cache_key(code))
+        if recipe_id is None:
+            recipe_id = Recipe.objects.filter(short_code=code).values_list(
+                'id', flat=True
+            ).first() or MISSING
+            cache.set(cache_key(code), recipe_id, timeout(recipe_id))
+        local_cache.set(local_key, recipe_id, local_timeout(recipe_id))
+    return recipe_id or None
+
+
+async def aresolve(code):
+    """Асинхронный вариант resolve"""
+
+    if not SHORT_CODE.fullmatch(code):
+        return None
+    local_key = (await links_version.aget(), code)
+    recipe_id = local_cache.get(local_key)
+    if recipe_id is None:
+        recipe_id = await cache.aget(cache_key(code))
+        if recipe_id is None:
+            recipe_id = await Recipe.objects.filter(
+                short_code=code
+            ).values_list('id', flat=True).afirst() or MISSING
+            await cache.aset(cache_key(code), recipe_id, timeout(recipe_id))
+        local_cache.set(local_key, recipe_id, local_timeout(recipe_id))
+    return recipe_id or None
+
+
+def forget(code):
+    """Сброс закэшированного кода при создании и удалении рецепта.
+
+    Кэши процессов сбрасывает смена версии кодов через шину
+    инвалидации, остальные процессы замечают ее не позже чем через
+    SHORT_LINK_VERSION_INTERVAL. Из общего кэша код удаляется после
+    фиксации транзакции, чтобы чтение до фиксации не закэшировало
+    прежнее значение. Публикация версии регистрируется раньше,
+    поэтому текущий процесс после фиксации читает уже новую версию"""
+
+    invalidate(SHORT_LINKS_VERSION)
+
+    def forget_committed():
+        cache.delete(cache_key(code))
+        links_version.expire()
+
+    transaction.on_commit(forget_committed)
+
+
+def flush_link_hits(hits):
+    """Сохранение накопленных переходов одним UPDATE"""
+
+    if not hits:
+        return
+    Recipe.objects.filter(pk__in=[recipe_id for recipe_id, _ in hits]).update(
+        link_hits=F('link_hits') + Case(
+            *(When(pk=recipe_id, then=Value(count))
+              for recipe_id, count in hits)
+        )
+    )
+
+
+@atexit.register
+def flush_on_exit():
+    try:
+        flush_link_hits(link_hits.pop())
+    except Exception:
+        # БД уже может быть недоступна при остановке процесса
+        pass
@@ -0,0 +1,48 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    change_shopping_lists,
+    encode_short_code
+)
+from .recipe_index import recipe_index
+from .short_links import forget
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(**kwargs):
+    """Перестроение индекса подбора рецептов: вместе с ингредиентом
+    удаляются строки состава рецептов"""
+
+    recipe_index.reset()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_link_changed(instance, created=True, raw=False, **kwargs):
+    """Сброс закэшированного кода короткой ссылки при создании
+    рецепта (код мог быть закэширован как несуществующий)
+    и при удалении"""
+
+    if raw and not instance.short_code:
+        # loaddata сохраняет рецепты без вызова Recipe.save
+        instance.set_short_code()
+    if created:
+        forget(encode_short_code(instance.pk))
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    """Удаление рецепта из индекса подбора по ингредиентам"""
+
+    recipe_index.recipe_changed(instance.pk, None)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(instance, **kwargs):
+    """Вычитание рецепта из списков покупок до каскадного
+    удаления корзин"""
+
+    change_shopping_lists(ShoppingCart.objects.filter(recipe=instance), -1)
@@ -1,8 +1,15 @@
+from django.conf import settings
 from django.urls import include, path
 
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, UserViewSet
+from . import async_views
+from .views import (
+    IngredientViewSet,
+    MetricsView,
+    RecipeViewSet,
+    UserViewSet
+)
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='users')
@@ -10,6 +17,35 @@ router.register(r'ingredients', IngredientViewSet, basename='ingredients')
 router.register(r'recipes', RecipeViewSet, basename='recipes')
 
 urlpatterns = [
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+]
+
+if settings.ASYNC_VIEWS:
+    # асинхронные обработчики чтения перед маршрутами роутера,
+    # остальные запросы они передают синхронным вьюсетам
+    sync_views = {}
+    for pattern in router.urls:
+        sync_views.setdefault(pattern.name, pattern.callback)
+    urlpatterns += [
+        path(
+            'ingredients/', async_views.ingredient_list,
+            {'sync_view': sync_views['ingredients-list']}
+        ),
+        path(
+            'recipes/', async_views.recipe_list,
+            {'sync_view': sync_views['recipes-list']}
+        ),
+        path(
+            'recipes/<int:pk>/', async_views.recipe_detail,
+            {'sync_view': sync_views['recipes-detail']}
+        ),
+        path(
+            'recipes/<int:pk>/get-link/', async_views.recipe_get_link,
+            {'sync_view': sync_views['recipes-get-link']}
+        ),
+    ]
+
+urlpatterns += [
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
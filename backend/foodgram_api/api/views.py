@@ -1,11 +1,19 @@
+import hashlib
+
 from django_filters import rest_framework as rest_framework_filters
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.db.models import (
-    F,
-    Sum
+    Exists,
+    OuterRef,
+    Prefetch,
+    Value
 )
-from django.http import FileResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
 from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 
@@ -15,40 +23,93 @@ from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import (
     AllowAny,
+    IsAdminUser,
     IsAuthenticated,
     IsAuthenticatedOrReadOnly
 )
+from rest_framework.views import APIView
 
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotAcceptable, ValidationError
 
 from recipes.models import (
+    change_counter,
     Ingredient,
     Recipe,
     Favorite,
     ShoppingCart,
-    RecipeIngredient
+    shopping_list_by_unit
 )
+from tasks.queue import enqueue
+from users.models import Follow
+from users.tasks import process_avatar
 from .serializers import (
     IngredientSerializer,
     ReadRecipeSerializer,
     CreateRecipeSerializer,
+    MatchedRecipeSerializer,
+    RecipeIdsSerializer,
+    RecipeMatchQuerySerializer,
     ShortRecipeSerializer,
+    ShoppingListTotalSerializer,
     UserRecipesSerializer,
     SubscribeSerializer
 )
 
+from . import conditional, feed_cache
+from .cache import INGREDIENTS_VERSION, RECIPES_VERSION, get_version
+from .consts import INGREDIENTS_CACHE_TIMEOUT
+from .ingredient_index import ingredient_index
 from .filters import (
     IngredientFilter,
     RecipeFilter
 )
+from .metrics import registry
+from .mixins import MetricsMixin
+from .pagination import PageLimitPagination, RecipePagination
+from .recipe_index import recipe_index
 from .permissions import IsAuthorOrReadOnly
+from .renderers import (
+    CSVRenderer,
+    FormatContentNegotiation,
+    PDFRenderer,
+    PlainTextRenderer
+)
+from .short_links import forget
+from .shopping_list import (
+    CHUNK_SIZE,
+    SHOPPING_LIST_FORMATS,
+    aiterate,
+    get_pdf_font
+)
 
 User = get_user_model()
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+def ingredients_cache_key(version, name):
+    return 'ingredients:{}:{}'.format(
+        version, hashlib.md5(name.encode()).hexdigest()
+    )
+
+
+def render_ingredients(name):
+    """ETag и JSON списка ингредиентов, начинающихся с name"""
+
+    content = JSONRenderer().render(ingredient_index.search(name))
+    return f'"{hashlib.md5(content).hexdigest()}"', content
+
+
+def ingredients_response(request, etag, content):
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    return response
+
+
+class IngredientViewSet(MetricsMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для работы с ингридиентами"""
 
     queryset = Ingredient.objects.all()
@@ -58,12 +119,41 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (AllowAny, )
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        """Список ингредиентов из кэша, привязанного к версии
+        каталога, с поддержкой условных запросов по ETag"""
+
+        name = request.query_params.get('name', '')
+        key = ingredients_cache_key(get_version(INGREDIENTS_VERSION), name)
+        cached = cache.get(key)
+        if cached is None:
+            cached = render_ingredients(name)
+            cache.set(key, cached, INGREDIENTS_CACHE_TIMEOUT)
+        return ingredients_response(request, *cached)
+
 
-class UserViewSet(UserViewSet):
+class UserViewSet(MetricsMixin, UserViewSet):
     """Вьюсет для работы с пользователями"""
 
     lookup_url_kwarg = 'pk'
 
+    def get_authors_with_recipes(self, request):
+        """Авторы с подписками и последними рецептами,
+        загруженными одним запросом на всю страницу"""
+
+        recipes = Recipe.objects.all()
+        recipes_limit = request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes[:int(recipes_limit)]
+
+        return User.objects.annotate(
+            is_subscribed=Exists(Follow.objects.filter(
+                subscriber=request.user, author=OuterRef('pk')
+            ))
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        ).order_by('username')
+
     @action(
         methods=('get', ),
         detail=False,
@@ -99,6 +189,7 @@ class UserViewSet(UserViewSet):
             )
             serializer.is_valid(raise_exception=True)
             serializer.save()
+            enqueue(process_avatar, user.id, user.avatar.name)
 
             return Response(
                 {'avatar': serializer.data['avatar']},
@@ -127,7 +218,9 @@ class UserViewSet(UserViewSet):
     def subscriptions(self, request):
         """Функция для возврата подписок пользователя"""
 
-        queryset = User.objects.filter(authors__subscriber=request.user)
+        queryset = self.get_authors_with_recipes(request).filter(
+            authors__subscriber=request.user
+        )
         pages = self.paginate_queryset(queryset)
         serializer = UserRecipesSerializer(
             pages, many=True, context={'request': request}
@@ -154,9 +247,14 @@ class UserViewSet(UserViewSet):
                 context={'request': request}
             )
             subSerializer.is_valid(raise_exception=True)
-            subSerializer.save()
+            with transaction.atomic():
+                subSerializer.save()
+                change_counter(
+                    User.objects.filter(pk=author.pk), 'followers_count', 1
+                )
             serializer = UserRecipesSerializer(
-                author, context={'request': request}
+                self.get_authors_with_recipes(request).get(pk=author.pk),
+                context={'request': request}
             )
             return Response(
                 serializer.data,
@@ -170,27 +268,121 @@ class UserViewSet(UserViewSet):
                     {'detail': 'Вы не подписаны на этого пользователя.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            obj.delete()
+            with transaction.atomic():
+                obj.delete()
+                change_counter(
+                    User.objects.filter(pk=author.pk), 'followers_count', -1
+                )
             return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(MetricsMixin, viewsets.ModelViewSet):
     """Вьюсет для работы с рецептами"""
 
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly)
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilter
+    pagination_class = RecipePagination
+
+    def get_queryset(self):
+        """Рецепты с автором, ингредиентами и флагами текущего
+        пользователя, вычисленными в одном запросе"""
+
+        user = self.request.user
+        if not user.is_authenticated:
+            return self.get_shared_queryset()
+        queryset = Recipe.objects.select_related('author').prefetch_related(
+            'recipe_ingredient__ingredient'
+        )
+        return queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_author_subscribed=Exists(Follow.objects.filter(
+                subscriber=user, author=OuterRef('author')
+            ))
+        )
+
+    def get_shared_queryset(self):
+        """Рецепты в том виде, в каком их видит анонимный пользователь"""
+
+        return Recipe.objects.select_related('author').prefetch_related(
+            'recipe_ingredient__ingredient'
+        ).annotate(
+            is_favorited=Value(False),
+            is_in_shopping_cart=Value(False),
+            is_author_subscribed=Value(False)
+        )
+
+    def list(self, request, *args, **kwargs):
+        """Лента с поддержкой условных запросов"""
+
+        validators = conditional.get_list_validators(request.user)
+        response = conditional.not_modified(request, *validators)
+        if response is None:
+            response = self.get_feed(request, *args, **kwargs)
+        return conditional.set_validators(response, *validators)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Рецепт с поддержкой условных запросов. Для проверки
+        ETag читается только время изменения рецепта"""
+
+        validators = conditional.get_recipe_validators(
+            self.kwargs['pk'], request.user
+        )
+        if validators is None:
+            return super().retrieve(request, *args, **kwargs)
+        response = conditional.not_modified(request, *validators)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        return conditional.set_validators(response, *validators)
+
+    def get_feed(self, request, *args, **kwargs):
+        """Лента из общего для всех пользователей кэша страниц
+        с наложенными флагами текущего пользователя"""
+
+        if not feed_cache.is_cacheable(request):
+            return super().list(request, *args, **kwargs)
+        data = feed_cache.get_page(request)
+        if data is None:
+            version = get_version(RECIPES_VERSION)
+            queryset = self.filter_queryset(self.get_shared_queryset())
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
+            data = self.get_paginated_response(serializer.data).data
+            feed_cache.set_page(request, data, version)
+        return Response(feed_cache.personalize(
+            data, feed_cache.get_overlay(request.user)
+        ))
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return ReadRecipeSerializer
+        if self.action == 'match':
+            return MatchedRecipeSerializer
         return CreateRecipeSerializer
 
     def perform_create(self, serializer):
         """Подтверждение записи рецепта в БД"""
 
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            serializer.save(author=self.request.user)
+            change_counter(
+                User.objects.filter(pk=self.request.user.pk),
+                'recipes_count', 1
+            )
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            change_counter(
+                User.objects.filter(pk=instance.author_id),
+                'recipes_count', -1
+            )
 
     def check_in_fav_or_sc(self, model, request, recipe_id):
         """Добавление/удаление рецепта в
@@ -199,9 +391,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
         user = request.user
         recipe = get_object_or_404(Recipe, pk=recipe_id)
         if request.method == 'POST':
-            obj, is_created = model.objects.get_or_create(
-                user_id=user.id, recipe_id=recipe.id
-            )
+            with transaction.atomic():
+                is_created = bool(model.add_recipes(user, (recipe.id, )))
+                if is_created:
+                    change_counter(
+                        Recipe.objects.filter(pk=recipe.id),
+                        model.counter_field, 1
+                    )
             if not is_created:
                 return Response(
                     {'detail': 'Рецепт уже в избранном'},
@@ -214,9 +410,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
 
         elif request.method == 'DELETE':
-            deleted, _ = model.objects.filter(
-                user=user, recipe=recipe
-            ).delete()
+            with transaction.atomic():
+                deleted = bool(model.remove_recipes(user, (recipe.id, )))
+                if deleted:
+                    change_counter(
+                        Recipe.objects.filter(pk=recipe.id),
+                        model.counter_field, -1
+                    )
             if deleted:
                 return Response(
                     {'detail': 'Рецепт успешно удален из избранного'},
@@ -225,6 +425,67 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'Рецепт не найден в избранном'},
                             status=status.HTTP_400_BAD_REQUEST)
 
+    def bulk_fav_or_sc(self, model, request):
+        """Пакетное добавление/удаление рецептов в
+        избранное/корзину с результатом по каждому id"""
+
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['recipes']))
+        user = request.user
+        with transaction.atomic():
+            found = set(Recipe.objects.filter(pk__in=ids).values_list(
+                'pk', flat=True
+            ))
+            # изменившиеся строки определяет сама БД, поэтому
+            # параллельные запросы не учитывают одни рецепты дважды
+            if request.method == 'POST':
+                changed = model.add_recipes(user, sorted(found))
+                delta, done, skipped = 1, 'added', 'exists'
+            else:
+                changed = model.remove_recipes(user, found)
+                delta, done, skipped = -1, 'removed', 'absent'
+            if changed:
+                change_counter(
+                    Recipe.objects.filter(pk__in=changed),
+                    model.counter_field, delta
+                )
+        return Response({'recipes': [
+            {
+                'id': recipe_id,
+                'status': (
+                    'not_found' if recipe_id not in found
+                    else done if recipe_id in changed
+                    else skipped
+                )
+            }
+            for recipe_id in ids
+        ]})
+
+    @action(
+        methods=('post', 'delete'),
+        detail=False,
+        url_path='favorite',
+        url_name='favorite-bulk',
+        permission_classes=(IsAuthenticated,),
+    )
+    def favorite_bulk(self, request):
+        """Добавление/удаление списка рецептов в(из) избранное(го)"""
+
+        return self.bulk_fav_or_sc(Favorite, request)
+
+    @action(
+        methods=('post', 'delete'),
+        detail=False,
+        url_path='shopping_cart',
+        url_name='shopping_cart-bulk',
+        permission_classes=(IsAuthenticated, ),
+    )
+    def shopping_cart_bulk(self, request):
+        """Добавление/удаление списка рецептов в(из) корзину(ы)"""
+
+        return self.bulk_fav_or_sc(ShoppingCart, request)
+
     @action(
         methods=('post', 'delete'),
         detail=True,
@@ -249,48 +510,101 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.check_in_fav_or_sc(ShoppingCart, request, pk)
 
-    def create_file_structure(self, user, recipes, ingredients):
-        return '\n'.join([
-            f"Список покупок пользователя {user}",
-            "___________________________",
-            "Список рецептов:",
-            *(
-                f"- {recipe.name}" for recipe in recipes),
-            "",
-            "Список ингредиентов:",
-            *(f"{i}. {item['name']} — "
-              f"{item['amount']} {item['unit']}"
-              for i, item in enumerate(ingredients, 1))]
-        )
-
     @action(
         methods=('get', ),
         detail=False,
         url_path='download_shopping_cart',
         url_name='download_shopping_cart',
         permission_classes=(IsAuthenticated, ),
+        renderer_classes=(
+            PlainTextRenderer,
+            CSVRenderer,
+            JSONRenderer,
+            PDFRenderer
+        ),
+        content_negotiation_class=FormatContentNegotiation,
     )
     def download_shopping_cart(self, request):
+        """Потоковая выгрузка списка покупок в формате из
+        параметра format: txt (по умолчанию), csv, json или pdf"""
+
         user = request.user
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shopping_carts__user=request.user
-        ).values(
-            name=F('ingredient__name'),
-            unit=F('ingredient__measurement_unit')
-        ).annotate(amount=Sum('amount')).order_by('name')
+        ingredients = shopping_list_by_unit(user.shopping_list.all())
 
         recipes = Recipe.objects.filter(
             shopping_carts__user=user
-        ).select_related('author')
+        ).values_list('name', flat=True)
+
+        content_type, extension, export = SHOPPING_LIST_FORMATS[
+            request.accepted_renderer.format
+        ]
+        if extension == 'pdf' and get_pdf_font() is None:
+            # проверка до начала потока: ошибку внутри потока
+            # клиент получил бы как оборванный файл
+            raise NotAcceptable(
+                'Выгрузка в PDF недоступна: не найден шрифт с кириллицей.'
+            )
+        content = export(
+            user,
+            recipes.iterator(chunk_size=CHUNK_SIZE),
+            ingredients.iterator(chunk_size=CHUNK_SIZE)
+        )
+        if settings.ASYNC_VIEWS:
+            content = aiterate(content)
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{extension}"'
+        )
+        return response
+
+    @action(
+        methods=('get', ),
+        detail=False,
+        url_path='match',
+        url_name='match',
+    )
+    def match(self, request):
+        """Рецепты, которые можно приготовить из переданных ингредиентов
+        (ingredients=1,2,3), если не хватает не более missing из них.
+        Сначала идут рецепты с большей долей имеющихся ингредиентов"""
+
+        params = RecipeMatchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        matched = recipe_index.match(
+            params.validated_data['ingredients'],
+            params.validated_data['missing']
+        )
+        # курсор ленты к рейтингу подбора неприменим
+        paginator = PageLimitPagination()
+        page = paginator.paginate_queryset(matched, request, view=self)
+        missing = dict(page)
+        recipes = self.get_queryset().in_bulk(missing)
+        found = []
+        for recipe_id, _ in page:
+            # рецепт мог быть удален после построения индекса
+            if recipe_id in recipes:
+                recipe = recipes[recipe_id]
+                recipe.missing = missing[recipe_id]
+                found.append(recipe)
+        serializer = self.get_serializer(found, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
-        content = self.create_file_structure(user, recipes, ingredients)
+    @action(
+        methods=('get', ),
+        detail=False,
+        url_path='shopping_cart/totals',
+        url_name='shopping_cart-totals',
+        permission_classes=(IsAuthenticated, ),
+    )
+    def shopping_cart_totals(self, request):
+        """Суммарное количество ингредиентов в корзине
+        в базовых единицах измерения"""
 
-        return FileResponse(
-            content,
-            filename='shopping_list.txt',
-            as_attachment=True,
-            content_type='text/plain'
+        serializer = ShoppingListTotalSerializer(
+            shopping_list_by_unit(request.user.shopping_list.all()),
+            many=True
         )
+        return Response(serializer.data)
 
     @action(
         methods=('get', ),
@@ -299,9 +613,24 @@ class RecipeViewSet(viewsets.ModelViewSet):
         url_name='get-link',
     )
     def get_link(self, request, pk):
-        get_object_or_404(Recipe, pk=pk)
-        url = reverse('recipes:get_recipe_link', args=(pk,))
+        recipe = get_object_or_404(Recipe.objects.only('short_code'), pk=pk)
+        if not recipe.short_code:
+            recipe.set_short_code()
+            forget(recipe.short_code)
+        url = reverse('recipes:short_link', args=(recipe.short_code,))
         absolute_url = request.build_absolute_uri(url)
         return Response({
             'short-link': absolute_url
         })
+
+
+class MetricsView(APIView):
+    """Метрики запросов к API в текстовом формате Prometheus"""
+
+    permission_classes = (IsAdminUser, )
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
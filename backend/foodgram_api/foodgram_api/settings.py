@@ -39,10 +39,12 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
+    'tasks.apps.TasksConfig',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.QueryMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -71,6 +73,13 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram_api.wsgi.application'
 
+# режим сервера: wsgi (gunicorn) или asgi (uvicorn). В режиме asgi
+# часто читаемые эндпоинты обслуживаются асинхронными обработчиками
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+ASYNC_VIEWS = SERVER_MODE == 'asgi'
+# число процессов сервера (start.sh)
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', 1))
+
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
@@ -98,6 +107,39 @@ else:
     }
 
 
+# Cache
+# file по умолчанию (общий для процессов одного хоста), redis для
+# нескольких контейнеров или хостов, locmem только для одного
+# процесса: проверка api.E001 не даст запустить с ним несколько
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHE_LOCATIONS = {
+    'locmem': 'foodgram',
+    'file': str(BASE_DIR / 'cache'),
+    'redis': 'redis://127.0.0.1:6379/1',
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'file')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', CACHE_LOCATIONS[CACHE_BACKEND]
+        ),
+    }
+}
+
+# брокер шины инвалидации кэшей (api.invalidation). Версии тегов
+# согласованы между процессами только при общем кэше (file, redis)
+INVALIDATION_BROADCASTER = os.getenv(
+    'INVALIDATION_BROADCASTER', 'api.invalidation.CacheVersionBroadcaster'
+)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -154,6 +196,11 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.Base64JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.PageLimitPagination',
     'PAGE_SIZE': 10,
 }
@@ -174,3 +221,28 @@ DJOSER = {
 }
 
 CORS_ALLOWED_ORIGINS = os.getenv('DJANGO_CORS_ALLOWED_ORIGINS', '').split()
+
+# шрифт с кириллицей для выгрузки списка покупок в PDF
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+# выполнение фоновых задач: eager, thread или database. Очередь
+# в БД обрабатывает команда run_tasks, задачи пула потоков (thread)
+# теряются при перезапуске процесса
+TASKS_BACKEND = os.getenv('TASKS_BACKEND', 'database')
+TASKS_THREADS = int(os.getenv('TASKS_THREADS', 2))
+# время (в секундах), после которого выполняемая задача считается
+# брошенной аварийно завершившимся обработчиком
+TASKS_RUNNING_TIMEOUT = int(os.getenv('TASKS_RUNNING_TIMEOUT', 600))
+# пауза (в секундах) перед повтором задачи после ошибки,
+# удваивается с каждой попыткой
+TASKS_RETRY_DELAY = int(os.getenv('TASKS_RETRY_DELAY', 30))
+# функции, которые можно выполнять фоновыми задачами. Очередь в БД
+# хранит имя функции, и обработчик не выполняет имена не из списка
+TASKS = (
+    'api.short_links.flush_link_hits',
+    'recipes.tasks.process_recipe_image',
+    'users.tasks.process_avatar',
+)
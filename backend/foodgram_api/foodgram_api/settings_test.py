@@ -0,0 +1,28 @@
+"""Настройки для запуска тестов: SQLite, локальный кэш
+и синхронное выполнение фоновых задач"""
+
+import tempfile
+
+from .settings import *  # noqa: F401, F403
+
+SECRET_KEY = 'test'
+ALLOWED_HOSTS = ['testserver']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+INVALIDATION_BROADCASTER = 'api.invalidation.CacheVersionBroadcaster'
+
+SERVER_MODE = 'wsgi'
+ASYNC_VIEWS = False
+TASKS_BACKEND = 'eager'
+MEDIA_ROOT = tempfile.mkdtemp(prefix='foodgram-test-media-')
+WEB_WORKERS = 1
@@ -1,11 +1,14 @@
 from django.contrib import admin
 
+from api.recipe_index import recipe_index
 from .models import (
     Ingredient,
+    MeasurementUnit,
     Recipe,
     RecipeIngredient,
     Favorite,
-    ShoppingCart
+    ShoppingCart,
+    ShoppingListItem
 )
 
 
@@ -26,6 +29,16 @@ class IngredientAdmin(BaseAdmin):
     fields = ('name', 'id', 'measurement_unit')
 
 
+@admin.register(MeasurementUnit)
+class MeasurementUnitAdmin(BaseAdmin):
+    """Класс для единиц измерения"""
+
+    list_display = ('name', 'id', 'base', 'factor')
+    search_fields = ('name',)
+    list_select_related = ('base', )
+    fields = ('name', 'id', 'base', 'factor')
+
+
 class RecipeIngredientInline(admin.TabularInline):
     """Класс для редактирования связей"""
     model = Recipe.ingredients.through
@@ -40,17 +53,29 @@ class RecipeAdmin(BaseAdmin):
     search_fields = ('name', 'author__username')
     list_filter = ('name', 'author')
     inlines = (RecipeIngredientInline,)
-    readonly_fields = ('id', 'favorites_count', 'pub_date')
+    readonly_fields = (
+        'id', 'favorites_count', 'cart_count', 'link_hits', 'short_code',
+        'pub_date', 'updated_at'
+    )
+    list_select_related = ('author', )
 
     fieldsets = (
-        (None, {'fields': ('name', 'id', 'author', 'pub_date')}),
+        (None, {'fields': (
+            'name', 'id', 'author', 'pub_date', 'updated_at'
+        )}),
         ('Content', {'fields': ('image', 'text', 'cooking_time')}),
-        ('Statistics', {'fields': ('favorites_count',)}),
+        ('Statistics', {'fields': (
+            'favorites_count', 'cart_count', 'short_code', 'link_hits'
+        )}),
     )
 
-    def favorites_count(self, obj):
-        return obj.favorites.count()
-    favorites_count.short_description = 'Добавлений в избранное'
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        recipe = form.instance
+        recipe_index.recipe_changed(
+            recipe.id,
+            recipe.recipe_ingredient.values_list('ingredient_id', flat=True)
+        )
 
 
 @admin.register(RecipeIngredient)
@@ -61,12 +86,25 @@ class RecipeIngredientAdmin(BaseAdmin):
     search_fields = ('recipe__name', 'ingredient__name')
     fields = ('id', 'recipe', 'ingredient', 'amount')
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        recipe_index.reset()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        recipe_index.reset()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        recipe_index.reset()
+
 
 @admin.register(Favorite)
 class FavoriteAdmin(BaseAdmin):
     """Класс для редактирования избранного"""
 
     list_display = ('id', 'user', 'recipe')
+    ordering = ('user__username', 'recipe__name')
     search_fields = ('user__username', 'recipe__name')
     fields = ('id', 'user', 'recipe')
 
@@ -76,5 +114,16 @@ class ShoppingCartAdmin(BaseAdmin):
     """Класс для редактирования корзины"""
 
     list_display = ('id', 'user', 'recipe')
+    ordering = ('user__username', 'recipe__name')
     search_fields = ('user__username', 'recipe__name')
     fields = ('id', 'user', 'recipe')
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(BaseAdmin):
+    """Класс для просмотра списков покупок"""
+
+    list_display = ('id', 'user', 'ingredient', 'amount')
+    search_fields = ('user__username', 'ingredient__name')
+    list_select_related = ('user', 'ingredient')
+    readonly_fields = ('id', 'user', 'ingredient', 'amount')
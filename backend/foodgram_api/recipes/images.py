@@ -0,0 +1,119 @@
+import io
+import logging
+import os
+from time import perf_counter
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# максимальные размеры сохраняемого изображения
+MAX_IMAGE_SIZE = (1920, 1920)
+# ширина и высота миниатюр для ленты и карточек рецептов
+THUMBNAIL_SIZES = {
+    'small': (320, 320),
+    'medium': (640, 640),
+}
+WEBP_QUALITY = 80
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': WEBP_QUALITY, 'method': 4},
+}
+
+
+def prepare(image, image_format):
+    """Поворот по EXIF и приведение режима к поддерживаемому форматом"""
+
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    if image_format == 'JPEG' and image.mode == 'RGBA':
+        image = image.convert('RGB')
+    return image
+
+
+def encode(image, image_format):
+    buffer = io.BytesIO()
+    # метаданные (EXIF, профили, комментарии) не передаются при сохранении
+    image.save(buffer, format=image_format, **SAVE_OPTIONS[image_format])
+    return buffer.getvalue()
+
+
+def normalize_image(file):
+    """Уменьшение изображения до MAX_IMAGE_SIZE и удаление метаданных.
+
+    Анимированные изображения возвращаются без изменений."""
+
+    started = perf_counter()
+    file.seek(0)
+    with Image.open(file) as image:
+        image_format = image.format
+        if (getattr(image, 'is_animated', False)
+                or image_format not in SAVE_OPTIONS):
+            file.seek(0)
+            return file
+        image = prepare(image, image_format)
+        image.thumbnail(MAX_IMAGE_SIZE)
+        content = encode(image, image_format)
+    logger.info(
+        'Изображение %s обработано за %.1f мс: %s -> %s байт',
+        file.name, (perf_counter() - started) * 1000, file.size, len(content)
+    )
+    return ContentFile(content, name=file.name)
+
+
+def normalize_stored_image(field_file):
+    """Обработка уже сохраненного изображения с заменой файла на месте,
+    чтобы выданные ранее ссылки оставались рабочими"""
+
+    with field_file.open('rb'):
+        content = normalize_image(field_file)
+    if content is field_file:
+        return field_file.name
+    storage, name = field_file.storage, field_file.name
+    storage.delete(name)
+    return storage.save(name, content)
+
+
+def variant_name(name, suffix):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'variants', f'{stem}_{suffix}.webp')
+
+
+def build_variants(field_file):
+    """Миниатюры THUMBNAIL_SIZES и полноразмерная копия в WebP.
+
+    Возвращает словарь {вариант: путь в хранилище}."""
+
+    if not field_file:
+        return {}
+    started = perf_counter()
+    variants = {}
+    with field_file.open('rb'), Image.open(field_file) as original:
+        original = prepare(original, 'WEBP')
+        sizes = {'webp': None, **THUMBNAIL_SIZES}
+        for suffix, size in sizes.items():
+            image = original.copy()
+            if size is not None:
+                image.thumbnail(size)
+            name = variant_name(field_file.name, suffix)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            variants[suffix] = default_storage.save(
+                name, ContentFile(encode(image, 'WEBP'))
+            )
+    logger.info(
+        'Варианты изображения %s построены за %.1f мс',
+        field_file.name, (perf_counter() - started) * 1000
+    )
+    return variants
+
+
+def delete_variants(variants):
+    for name in (variants or {}).values():
+        default_storage.delete(name)
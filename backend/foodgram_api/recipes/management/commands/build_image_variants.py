@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import build_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Построение миниатюр и WebP-копий изображений рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перестроить варианты и для рецептов, где они уже есть'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(image_variants={})
+        built = 0
+        for recipe in recipes.only('id', 'image').iterator():
+            try:
+                variants = build_variants(recipe.image)
+            except OSError as error:
+                self.stderr.write(f'Рецепт {recipe.id}: {error}')
+                continue
+            Recipe.objects.filter(pk=recipe.pk).update(
+                image_variants=variants
+            )
+            built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Построены варианты изображений для {built} рецептов'
+        ))
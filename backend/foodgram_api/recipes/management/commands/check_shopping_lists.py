@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import (
+    ShoppingCart,
+    ShoppingListItem,
+    change_shopping_lists,
+    shopping_list_totals
+)
+
+
+class Command(BaseCommand):
+    help = ('Сверка материализованных списков покупок с корзинами '
+            'пользователей. С --fix расходящиеся списки пересобираются')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Пересобрать списки пользователей с расхождениями'
+        )
+
+    def find_drift(self):
+        """id пользователей, чьи списки расходятся с корзинами"""
+
+        expected = {
+            (user_id, ingredient_id): total
+            for user_id, ingredient_id, total in shopping_list_totals(
+                ShoppingCart.objects.all()
+            ).values_list(
+                'user_id', 'recipe__recipe_ingredient__ingredient_id', 'total'
+            ).iterator()
+        }
+        drift = set()
+        for user_id, ingredient_id, amount in (
+            ShoppingListItem.objects.values_list(
+                'user_id', 'ingredient_id', 'amount'
+            ).iterator()
+        ):
+            if expected.pop((user_id, ingredient_id), None) != amount:
+                drift.add(user_id)
+        drift.update(user_id for user_id, _ in expected)
+        return drift
+
+    def handle(self, *args, **options):
+        drift = self.find_drift()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        if not options['fix']:
+            raise CommandError(
+                f'Списки покупок расходятся с корзинами у пользователей: '
+                f'{len(drift)}'
+            )
+        with transaction.atomic():
+            ShoppingListItem.objects.filter(user_id__in=drift).delete()
+            change_shopping_lists(
+                ShoppingCart.objects.filter(user_id__in=drift)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано списков покупок: {len(drift)}'
+        ))
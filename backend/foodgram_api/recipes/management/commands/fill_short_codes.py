@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.short_links import forget
+from recipes.models import fill_short_codes
+
+
+class Command(BaseCommand):
+    help = ('Заполнение кодов коротких ссылок рецептов, у которых их нет, '
+            'например загруженных из фикстуры')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            codes = fill_short_codes()
+        for code in codes:
+            forget(code)
+        self.stdout.write(self.style.SUCCESS(
+            f'Заполнено коротких ссылок: {len(codes)}'
+        ))
@@ -0,0 +1,154 @@
+import csv
+import io
+import json
+from itertools import islice
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.cache import INGREDIENTS_VERSION
+from api.invalidation import invalidate
+from recipes.models import Ingredient, MeasurementUnit
+
+DEFAULT_PATH = settings.BASE_DIR.parent / 'data' / 'ingredients.csv'
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as file:
+        for row in csv.reader(file):
+            if len(row) >= 2:
+                yield row[0].strip(), row[1].strip()
+
+
+def read_json(path):
+    with open(path, encoding='utf-8') as file:
+        for item in json.load(file):
+            # поддерживаются и простой список, и фикстура Django
+            fields = item.get('fields', item)
+            yield (fields['name'].strip(),
+                   fields['measurement_unit'].strip())
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = ('Загрузка ингредиентов из CSV или JSON. Повторный запуск '
+            'не создает дублей по паре (название, единица измерения)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=str(DEFAULT_PATH),
+            help='Путь к файлу с ингредиентами'
+        )
+        parser.add_argument(
+            '--format', choices=READERS, default=None,
+            help='Формат файла, по умолчанию определяется по расширению'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+            help='Количество строк, записываемых за один запрос'
+        )
+
+    def unique_rows(self, rows):
+        seen = set()
+        for name, unit in rows:
+            if name and unit and (name, unit) not in seen:
+                seen.add((name, unit))
+                yield name, unit
+
+    def load_bulk(self, chunks):
+        """Вставка пачками через bulk_create, конфликты пропускаются"""
+
+        count_before = Ingredient.objects.count()
+        for chunk in chunks:
+            Ingredient.objects.bulk_create(
+                (Ingredient(name=name, measurement_unit=unit)
+                 for name, unit in chunk),
+                ignore_conflicts=True
+            )
+        return Ingredient.objects.count() - count_before
+
+    def load_copy(self, chunks):
+        """Загрузка в PostgreSQL через COPY во временную таблицу
+        и перенос новых строк одним запросом"""
+
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_staging '
+                '(name varchar(128), measurement_unit varchar(64)) '
+                'ON COMMIT DROP'
+            )
+            for chunk in chunks:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(chunk)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredient_staging FROM STDIN WITH (FORMAT csv)',
+                    buffer
+                )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredient_staging '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+            return cursor.rowcount
+
+    def handle(self, *args, **options):
+        path = options['path']
+        data_format = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if data_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {data_format}')
+        if options['chunk_size'] < 1:
+            raise CommandError('Размер пачки должен быть больше нуля.')
+
+        started = perf_counter()
+        total = 0
+
+        def counted(rows):
+            nonlocal total
+            for row in rows:
+                total += 1
+                yield row
+
+        try:
+            chunks = chunked(
+                self.unique_rows(counted(READERS[data_format](path))),
+                options['chunk_size']
+            )
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    created = self.load_copy(chunks)
+                else:
+                    created = self.load_bulk(chunks)
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+
+        # новые единицы измерения попадают в справочник без перевода
+        MeasurementUnit.objects.bulk_create(
+            (MeasurementUnit(name=name) for name in Ingredient.objects.exclude(
+                measurement_unit__in=MeasurementUnit.objects.values('name')
+            ).values_list('measurement_unit', flat=True).distinct()),
+            ignore_conflicts=True
+        )
+        # загрузка через COPY не проходит через ORM
+        invalidate(INGREDIENTS_VERSION)
+        elapsed = perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {total}, добавлено ингредиентов: {created}, '
+            f'время: {elapsed:.2f} с, {total / (elapsed or 1):.0f} строк/с'
+        ))
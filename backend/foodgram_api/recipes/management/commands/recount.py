@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow
+
+User = get_user_model()
+
+
+def count_by(model, field):
+    """Подзапрос с количеством строк model, ссылающихся на объект"""
+
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = ('Пересчет денормализованных счетчиков рецептов '
+            'и пользователей')
+
+    def recount(self, model, counters):
+        """Обновление только тех строк, где счетчик разошелся"""
+
+        queryset = model.objects.annotate(**{
+            f'actual_{field}': count for field, count in counters.items()
+        })
+        drift = Q()
+        for field in counters:
+            drift |= ~Q(**{field: F(f'actual_{field}')})
+        fixed = 0
+        for obj in queryset.filter(drift).only('pk').iterator():
+            model.objects.filter(pk=obj.pk).update(**{
+                field: getattr(obj, f'actual_{field}') for field in counters
+            })
+            fixed += 1
+        return fixed
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recipes = self.recount(Recipe, {
+                'favorites_count': count_by(Favorite, 'recipe'),
+                'cart_count': count_by(ShoppingCart, 'recipe'),
+            })
+            users = self.recount(User, {
+                'recipes_count': count_by(Recipe, 'author'),
+                'followers_count': count_by(Follow, 'author'),
+            })
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено рецептов: {recipes}, пользователей: {users}'
+        ))
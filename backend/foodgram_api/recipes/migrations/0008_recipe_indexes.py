@@ -0,0 +1,76 @@
+# Generated by Django 5.2.1 on 2026-10-17 06:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+INGREDIENT_NAME_INDEX = 'ingredient_name_upper_like_idx'
+
+
+def create_ingredient_name_index(apps, schema_editor):
+    # name__istartswith превращается в UPPER(name) LIKE 'X%',
+    # такой индекс поддерживается только PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INGREDIENT_NAME_INDEX} '
+        'ON recipes_ingredient (UPPER(name) text_pattern_ops)'
+    )
+
+
+def drop_ingredient_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INGREDIENT_NAME_INDEX}')
+
+
+def remove_duplicates(apps, schema_editor):
+    # без уникального ограничения get_or_create при параллельных
+    # запросах мог создать повторы, остается первая строка
+    for name in ('Favorite', 'ShoppingCart'):
+        model = apps.get_model('recipes', name)
+        model.objects.exclude(
+            id__in=model.objects.order_by().values(
+                'user', 'recipe'
+            ).annotate(first_id=Min('id')).values('first_id')
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_ingredient_unique_name_unit'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='favorite',
+            options={'default_related_name': 'favorites', 'verbose_name': 'Избранный рецепт', 'verbose_name_plural': 'Избранные рецепты'},
+        ),
+        migrations.AlterModelOptions(
+            name='shoppingcart',
+            options={'default_related_name': 'shopping_carts', 'verbose_name': 'Рецепт в корзине', 'verbose_name_plural': 'Рецепты в корзине'},
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date', '-id'], name='recipe_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='favorite_unique_user_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='shoppingcart_unique_user_recipe'),
+        ),
+        migrations.RunPython(
+            create_ingredient_name_index,
+            drop_ingredient_name_index
+        ),
+    ]
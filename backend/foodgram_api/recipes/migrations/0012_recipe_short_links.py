@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-17 06:22
+
+from django.db import migrations, models
+
+ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def encode(number):
+    code = ''
+    while True:
+        number, digit = divmod(number, len(ALPHABET))
+        code = ALPHABET[digit] + code
+        if not number:
+            return code
+
+
+def fill_short_codes(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    recipes = list(Recipe.objects.only('id'))
+    for recipe in recipes:
+        recipe.short_code = encode(recipe.id)
+    Recipe.objects.bulk_update(recipes, ('short_code', ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_image_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='link_hits',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Переходов по короткой ссылке'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='short_code',
+            field=models.CharField(editable=False, max_length=16, null=True, unique=True, verbose_name='Код короткой ссылки'),
+        ),
+        migrations.RunPython(fill_short_codes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from recipes.search import install_search, uninstall_search
+
+
+def forward(apps, schema_editor):
+    install_search(schema_editor)
+
+
+def backward(apps, schema_editor):
+    uninstall_search(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_short_links'),
+    ]
+
+    operations = [
+        migrations.RunPython(forward, backward),
+    ]
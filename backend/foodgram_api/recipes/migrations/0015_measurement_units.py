@@ -0,0 +1,60 @@
+# Generated by Django 5.2.1 on 2026-10-17 06:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# базовые единицы и перевод в них: (единица, базовая, множитель)
+CONVERSIONS = (
+    ('кг', 'г', 1000),
+    ('л', 'мл', 1000),
+)
+
+
+def fill_units(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    MeasurementUnit = apps.get_model('recipes', 'MeasurementUnit')
+    names = set(Ingredient.objects.values_list(
+        'measurement_unit', flat=True
+    ).distinct())
+    names.update(base for _, base, _ in CONVERSIONS)
+    MeasurementUnit.objects.bulk_create(
+        MeasurementUnit(name=name) for name in sorted(names)
+    )
+    for name, base, factor in CONVERSIONS:
+        MeasurementUnit.objects.update_or_create(
+            name=name,
+            defaults={
+                'base': MeasurementUnit.objects.get(name=base),
+                'factor': factor,
+            }
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeasurementUnit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True, verbose_name='Название')),
+                ('factor', models.PositiveIntegerField(default=1, verbose_name='Множитель перевода в базовую единицу')),
+                ('base', models.ForeignKey(blank=True, help_text='Пусто, если единица сама является базовой', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='recipes.measurementunit', verbose_name='Базовая единица')),
+            ],
+            options={
+                'verbose_name': 'Единица измерения',
+                'verbose_name_plural': 'Единицы измерения',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='unit',
+            field=models.ForeignObject(from_fields=('measurement_unit',), null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='recipes.measurementunit', to_fields=('name',)),
+        ),
+        migrations.RunPython(fill_units, migrations.RunPython.noop),
+    ]
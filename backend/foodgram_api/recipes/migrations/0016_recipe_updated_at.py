@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-17 06:39
+
+from django.db import migrations, models
+from django.db.models import F
+
+from recipes.search import install_search, uninstall_search
+
+
+def drop_sqlite_search(apps, schema_editor):
+    # SQLite пересоздает таблицу рецептов вместе с ее триггерами
+    if schema_editor.connection.vendor == 'sqlite':
+        uninstall_search(schema_editor)
+
+
+def restore_sqlite_search(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        install_search(schema_editor)
+
+
+def fill_updated_at(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Recipe.objects.update(updated_at=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_measurement_units'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_sqlite_search, restore_sqlite_search),
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='pub_date',
+            field=models.DateTimeField(auto_now_add=True, verbose_name='Дата публикации'),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+        migrations.RunPython(restore_sqlite_search, drop_sqlite_search),
+    ]
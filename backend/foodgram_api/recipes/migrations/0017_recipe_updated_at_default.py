@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-17 07:06
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+from recipes.search import install_search, uninstall_search
+
+
+def drop_sqlite_search(apps, schema_editor):
+    # SQLite пересоздает таблицу рецептов вместе с ее триггерами
+    if schema_editor.connection.vendor == 'sqlite':
+        uninstall_search(schema_editor)
+
+
+def restore_sqlite_search(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        install_search(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_sqlite_search, restore_sqlite_search),
+        migrations.AlterField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now(), verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(restore_sqlite_search, drop_sqlite_search),
+    ]
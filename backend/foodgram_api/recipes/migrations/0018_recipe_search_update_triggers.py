@@ -0,0 +1,21 @@
+from django.db import migrations
+
+from recipes.search import install_search, uninstall_search
+
+
+def reinstall_search(apps, schema_editor):
+    # триггеры изменения строк срабатывают только на столбцы,
+    # от которых зависит документ поиска
+    uninstall_search(schema_editor)
+    install_search(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_recipe_updated_at_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(reinstall_search, reinstall_search),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-17 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0018_recipe_search_update_triggers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Набор данных')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Изменений')),
+            ],
+            options={
+                'verbose_name': 'Счетчик изменений',
+                'verbose_name_plural': 'Счетчики изменений',
+            },
+        ),
+    ]
@@ -1,18 +1,70 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
-from django.db.models import UniqueConstraint
+from django.db import connection, models, transaction
+from django.db.models import F, Sum, UniqueConstraint, Value
+from django.db.models.functions import Coalesce, Greatest, Now
 
+from api.invalidation import (
+    InvalidatingQuerySet,
+    instance_tags,
+    invalidate
+)
 from api.consts import (
     MIN_INGREDIENT_VALUE,
     MAX_INGREDIENT_VALUE,
     MIN_COOKING_TIME,
-    MAX_COOKING_TIME
+    MAX_COOKING_TIME,
+    SHORT_CODE_ALPHABET
 )
 
 User = get_user_model()
 
 
+def encode_short_code(number):
+    """Код короткой ссылки: id рецепта в base62"""
+
+    base = len(SHORT_CODE_ALPHABET)
+    code = ''
+    while True:
+        number, digit = divmod(number, base)
+        code = SHORT_CODE_ALPHABET[digit] + code
+        if not number:
+            return code
+
+
+class MeasurementUnit(models.Model):
+    """Единица измерения ингредиентов и ее перевод в базовую"""
+
+    name = models.CharField(
+        verbose_name='Название',
+        max_length=64,
+        unique=True
+    )
+    base = models.ForeignKey(
+        'self',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        verbose_name='Базовая единица',
+        related_name='+',
+        help_text='Пусто, если единица сама является базовой'
+    )
+    factor = models.PositiveIntegerField(
+        verbose_name='Множитель перевода в базовую единицу',
+        default=1
+    )
+
+    class Meta:
+        verbose_name = 'Единица измерения'
+        verbose_name_plural = 'Единицы измерения'
+        ordering = ('name', )
+
+    def __str__(self):
+        if self.base_id is None:
+            return self.name
+        return f'{self.name} = {self.factor} {self.base.name}'
+
+
 class Ingredient(models.Model):
     """Модель ингридиента"""
 
@@ -24,11 +76,29 @@ class Ingredient(models.Model):
         verbose_name='Единица измерения',
         max_length=64
     )
+    # связь по названию единицы без отдельного столбца: ингредиенты
+    # с единицей не из справочника остаются без перевода
+    unit = models.ForeignObject(
+        MeasurementUnit,
+        on_delete=models.DO_NOTHING,
+        from_fields=('measurement_unit', ),
+        to_fields=('name', ),
+        null=True,
+        related_name='+'
+    )
+
+    objects = InvalidatingQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ('name', )
+        constraints = [
+            UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='Уникальный ингредиент'
+            )
+        ]
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
@@ -37,6 +107,15 @@ class Ingredient(models.Model):
 class Recipe(models.Model):
     """Модель рецепта"""
 
+    IMAGE_PENDING = 'pending'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, 'Обрабатывается'),
+        (IMAGE_READY, 'Готово'),
+        (IMAGE_FAILED, 'Ошибка обработки'),
+    )
+
     name = models.CharField(
         verbose_name='Название',
         max_length=200
@@ -49,6 +128,19 @@ class Recipe(models.Model):
         upload_to='recipes/',
         blank=True, null=False
     )
+    image_variants = models.JSONField(
+        verbose_name='Варианты изображения',
+        default=dict,
+        blank=True,
+        editable=False
+    )
+    image_status = models.CharField(
+        verbose_name='Статус изображения',
+        max_length=16,
+        choices=IMAGE_STATUS_CHOICES,
+        default=IMAGE_READY,
+        editable=False
+    )
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name='Время приготовления',
         validators=(
@@ -63,9 +155,15 @@ class Recipe(models.Model):
         )
     )
     pub_date = models.DateTimeField(
-        auto_now=True,
+        auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        # для строк, загруженных фикстурами без этого поля
+        db_default=Now(),
+        verbose_name='Дата изменения'
+    )
     ingredients = models.ManyToManyField(
         Ingredient,
         verbose_name='Ингредиенты',
@@ -78,15 +176,72 @@ class Recipe(models.Model):
         verbose_name='Автор',
         related_name='recipes'
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    cart_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в корзину',
+        default=0,
+        editable=False
+    )
+    short_code = models.CharField(
+        verbose_name='Код короткой ссылки',
+        max_length=16,
+        unique=True,
+        null=True,
+        editable=False
+    )
+    link_hits = models.PositiveIntegerField(
+        verbose_name='Переходов по короткой ссылке',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date', )
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.name}'
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if not self.short_code:
+            self.set_short_code()
+
+    def set_short_code(self):
+        """Код короткой ссылки строится по id, поэтому задается
+        после вставки"""
+
+        self.short_code = encode_short_code(self.pk)
+        Recipe.objects.filter(pk=self.pk, short_code=None).update(
+            short_code=self.short_code
+        )
+
+
+def fill_short_codes():
+    """Коды коротких ссылок рецептов, у которых их нет, например
+    загруженных из фикстуры. Возвращает заданные коды"""
+
+    recipes = list(Recipe.objects.filter(short_code=None).only('id'))
+    for recipe in recipes:
+        recipe.short_code = encode_short_code(recipe.id)
+    Recipe.objects.bulk_update(recipes, ('short_code', ), batch_size=1000)
+    return [recipe.short_code for recipe in recipes]
+
 
 class RecipeIngredient(models.Model):
     """Модель связи рецептов и ингридиентов"""
@@ -116,6 +271,8 @@ class RecipeIngredient(models.Model):
         )
     )
 
+    objects = InvalidatingQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Количество ингредиента'
         verbose_name_plural = 'Количество ингредиентов'
@@ -132,9 +289,66 @@ class RecipeIngredient(models.Model):
                 f' {self.amount} {self.ingredient.measurement_unit}')
 
 
+def change_counter(queryset, field, delta):
+    """Изменение денормализованного счетчика одним UPDATE"""
+
+    return queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
 class BaseModel(models.Model):
     """Базовая модель для корзины и избранного"""
 
+    # поле рецепта со счетчиком добавлений
+    counter_field = None
+
+    @classmethod
+    def recipes_added(cls, user, recipe_ids):
+        """Вызывается после добавления рецептов пользователю"""
+
+    @classmethod
+    def recipes_removing(cls, user, recipe_ids):
+        """Вызывается перед удалением рецептов у пользователя"""
+
+    @classmethod
+    def add_recipes(cls, user, recipe_ids):
+        """Добавление рецептов пользователю. Возвращает id рецептов,
+        строки которых вставил именно этот запрос: строки, вставленные
+        параллельным запросом, пропускаются через ON CONFLICT"""
+
+        if not recipe_ids:
+            return set()
+        table = connection.ops.quote_name(cls._meta.db_table)
+        values = ', '.join(['(%s, %s)'] * len(recipe_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, recipe_id) VALUES {values} '
+                'ON CONFLICT (user_id, recipe_id) DO NOTHING '
+                'RETURNING recipe_id',
+                [value for recipe_id in recipe_ids
+                 for value in (user.pk, recipe_id)]
+            )
+            added = {recipe_id for recipe_id, in cursor.fetchall()}
+        if added:
+            invalidate(*instance_tags(cls(user_id=user.pk)))
+            cls.recipes_added(user, added)
+        return added
+
+    @classmethod
+    def remove_recipes(cls, user, recipe_ids):
+        """Удаление рецептов у пользователя. Возвращает id удаленных
+        рецептов. Строки блокируются до удаления, поэтому параллельный
+        запрос не обработает те же рецепты повторно"""
+
+        removed = set(
+            cls.objects.select_for_update(of=('self', )).filter(
+                user=user, recipe_id__in=recipe_ids
+            ).order_by().values_list('recipe_id', flat=True)
+        )
+        if removed:
+            cls.recipes_removing(user, removed)
+            cls.objects.filter(user=user, recipe_id__in=removed).delete()
+        return removed
+
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -146,24 +360,24 @@ class BaseModel(models.Model):
         verbose_name='Рецепты',
     )
 
+    objects = InvalidatingQuerySet.as_manager()
+
     class Meta:
         abstract = True
         constraints = (
             UniqueConstraint(
                 fields=('user', 'recipe'),
-                name=(
-                    'В корзине и избранном должны быть '
-                    'только уникальные рецепты'
-                )
+                name='%(class)s_unique_user_recipe'
             ),
         )
-        ordering = ('user__username', 'recipe__name',)
 
 
 class Favorite(BaseModel):
     """Модель для избранного"""
 
-    class Meta:
+    counter_field = 'favorites_count'
+
+    class Meta(BaseModel.Meta):
         verbose_name = 'Избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
         default_related_name = 'favorites'
@@ -175,10 +389,150 @@ class Favorite(BaseModel):
 class ShoppingCart(BaseModel):
     """Модель для корзины"""
 
-    class Meta:
+    counter_field = 'cart_count'
+
+    class Meta(BaseModel.Meta):
         verbose_name = 'Рецепт в корзине'
         verbose_name_plural = 'Рецепты в корзине'
         default_related_name = 'shopping_carts'
 
     def __str__(self):
         return f'{self.recipe} в корзине {self.user}'
+
+    @classmethod
+    def recipes_added(cls, user, recipe_ids):
+        change_shopping_lists(
+            cls.objects.filter(user=user, recipe_id__in=recipe_ids)
+        )
+
+    @classmethod
+    def recipes_removing(cls, user, recipe_ids):
+        change_shopping_lists(
+            cls.objects.filter(user=user, recipe_id__in=recipe_ids), -1
+        )
+
+
+class ShoppingListItem(models.Model):
+    """Суммарное количество ингредиента в корзине пользователя.
+
+    Поддерживается при изменении корзины и состава рецептов
+    в ней, чтобы список покупок читался без агрегации."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='shopping_list'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+        related_name='+'
+    )
+    amount = models.IntegerField(verbose_name='Количество')
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Список покупок'
+        constraints = (
+            UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='shoppinglistitem_unique_user_ingredient'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.ingredient} x {self.amount} у {self.user}'
+
+
+def shopping_list_by_unit(items):
+    """Позиции списка покупок, сложенные по названию ингредиента
+    в базовых единицах измерения (кг в г, л в мл)"""
+
+    return items.values(
+        name=F('ingredient__name'),
+        unit=Coalesce(
+            'ingredient__unit__base__name', 'ingredient__measurement_unit'
+        )
+    ).annotate(
+        amount=Sum(
+            F('amount') * Coalesce('ingredient__unit__factor', Value(1))
+        )
+    ).order_by('name', 'unit')
+
+
+def shopping_list_totals(carts, sign=1):
+    """Количество ингредиентов по пользователям для корзин carts"""
+
+    return carts.filter(recipe__recipe_ingredient__isnull=False).order_by(
+    ).values('user_id', 'recipe__recipe_ingredient__ingredient_id').annotate(
+        total=Sum('recipe__recipe_ingredient__amount') * sign
+    )
+
+
+def change_shopping_lists(carts, sign=1):
+    """Прибавление (sign=1) или вычитание (sign=-1) состава рецептов
+    из корзин carts к спискам покупок их владельцев.
+
+    Выполняется одним INSERT ... ON CONFLICT DO UPDATE независимо
+    от числа рецептов, при вычитании обнулившиеся позиции удаляются
+    вторым запросом. Вычитать нужно до удаления корзин или состава."""
+
+    sql, params = shopping_list_totals(
+        carts, sign
+    ).query.sql_with_params()
+    table = connection.ops.quote_name(ShoppingListItem._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, ingredient_id, amount) {sql} '
+            'ON CONFLICT (user_id, ingredient_id) DO UPDATE '
+            f'SET amount = {table}.amount + EXCLUDED.amount',
+            params
+        )
+    if sign < 0:
+        ShoppingListItem.objects.filter(
+            user__in=carts.values('user_id'), amount__lte=0
+        ).delete()
+
+
+class ChangeCounter(models.Model):
+    """Счетчик изменений набора данных. Увеличивается в БД атомарно,
+    поэтому номера изменений не повторяются при любом кэше"""
+
+    name = models.CharField(
+        verbose_name='Набор данных',
+        max_length=64,
+        primary_key=True
+    )
+    value = models.BigIntegerField(verbose_name='Изменений', default=0)
+
+    class Meta:
+        verbose_name = 'Счетчик изменений'
+        verbose_name_plural = 'Счетчики изменений'
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
+
+    @classmethod
+    def current(cls, name):
+        value = cls.objects.filter(name=name).values_list(
+            'value', flat=True
+        ).first()
+        return value or 0
+
+    @classmethod
+    def increment(cls, name):
+        """Новый номер изменения. Строка счетчика остается
+        заблокированной до конца транзакции, поэтому прочитанное
+        значение - результат этого увеличения"""
+
+        with transaction.atomic():
+            if not cls.objects.filter(name=name).update(
+                value=F('value') + 1
+            ):
+                cls.objects.get_or_create(name=name)
+                cls.objects.filter(name=name).update(value=F('value') + 1)
+            return cls.objects.values_list('value', flat=True).get(
+                name=name
+            )
@@ -0,0 +1,274 @@
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVectorField
+)
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# конфигурация полнотекстового поиска PostgreSQL
+SEARCH_CONFIG = 'russian'
+# веса полей в ранжировании SQLite (bm25): название, ингредиенты, описание
+FTS_WEIGHTS = (10.0, 4.0, 1.0)
+
+# PostgreSQL: столбец tsvector с весами название (A), ингредиенты (B)
+# и описание (C), поддерживаемый триггерами, и GIN-индекс по нему
+POSTGRESQL_FORWARD = [
+    'ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector',
+    '''
+    CREATE FUNCTION recipes_recipe_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A')
+            || setweight(to_tsvector('russian', coalesce((
+                SELECT string_agg(i.name, ' ')
+                FROM recipes_recipeingredient ri
+                JOIN recipes_ingredient i ON i.id = ri.ingredient_id
+                WHERE ri.recipe_id = NEW.id
+            ), '')), 'B')
+            || setweight(to_tsvector('russian', coalesce(NEW.text, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE TRIGGER recipe_search_vector
+    BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+    FOR EACH ROW EXECUTE FUNCTION recipes_recipe_search_vector()
+    ''',
+    # изменение состава ингредиентов пересчитывает документ рецепта
+    # одним UPDATE на оператор
+    '''
+    CREATE FUNCTION recipes_recipeingredient_search() RETURNS trigger AS $$
+    BEGIN
+        UPDATE recipes_recipe SET name = name
+        WHERE id IN (SELECT recipe_id FROM changed_rows);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE TRIGGER recipeingredient_search_insert
+    AFTER INSERT ON recipes_recipeingredient
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION recipes_recipeingredient_search()
+    ''',
+    '''
+    CREATE TRIGGER recipeingredient_search_delete
+    AFTER DELETE ON recipes_recipeingredient
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION recipes_recipeingredient_search()
+    ''',
+    # изменение количества (bulk_update по amount) документ не меняет,
+    # а переходные таблицы несовместимы со списком столбцов в UPDATE OF,
+    # поэтому триггеры на изменение строк - построчные
+    '''
+    CREATE FUNCTION recipes_recipeingredient_moved() RETURNS trigger AS $$
+    BEGIN
+        UPDATE recipes_recipe SET name = name
+        WHERE id IN (OLD.recipe_id, NEW.recipe_id);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE TRIGGER recipeingredient_search_update
+    AFTER UPDATE OF recipe_id, ingredient_id ON recipes_recipeingredient
+    FOR EACH ROW
+    WHEN (OLD.recipe_id IS DISTINCT FROM NEW.recipe_id
+          OR OLD.ingredient_id IS DISTINCT FROM NEW.ingredient_id)
+    EXECUTE FUNCTION recipes_recipeingredient_moved()
+    ''',
+    '''
+    CREATE FUNCTION recipes_ingredient_search() RETURNS trigger AS $$
+    BEGIN
+        UPDATE recipes_recipe SET name = name
+        WHERE id IN (
+            SELECT recipe_id FROM recipes_recipeingredient
+            WHERE ingredient_id = NEW.id
+        );
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE TRIGGER ingredient_search_update
+    AFTER UPDATE OF name ON recipes_ingredient
+    FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+    EXECUTE FUNCTION recipes_ingredient_search()
+    ''',
+    'UPDATE recipes_recipe SET name = name',
+    '''
+    CREATE INDEX recipe_search_vector_idx
+    ON recipes_recipe USING GIN (search_vector)
+    ''',
+]
+
+POSTGRESQL_BACKWARD = [
+    'DROP TRIGGER IF EXISTS ingredient_search_update ON recipes_ingredient',
+    'DROP TRIGGER IF EXISTS recipeingredient_search_delete '
+    'ON recipes_recipeingredient',
+    'DROP TRIGGER IF EXISTS recipeingredient_search_update '
+    'ON recipes_recipeingredient',
+    'DROP TRIGGER IF EXISTS recipeingredient_search_insert '
+    'ON recipes_recipeingredient',
+    'DROP TRIGGER IF EXISTS recipe_search_vector ON recipes_recipe',
+    'DROP FUNCTION IF EXISTS recipes_ingredient_search()',
+    'DROP FUNCTION IF EXISTS recipes_recipeingredient_moved()',
+    'DROP FUNCTION IF EXISTS recipes_recipeingredient_search()',
+    'DROP FUNCTION IF EXISTS recipes_recipe_search_vector()',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+]
+
+# SQLite: таблица FTS5 с rowid = id рецепта, поддерживаемая триггерами
+SQLITE_DOCUMENT = '''
+    INSERT INTO recipes_recipe_fts(rowid, name, ingredients, text)
+    SELECT r.id, r.name, (
+        SELECT group_concat(i.name, ' ')
+        FROM recipes_recipeingredient ri
+        JOIN recipes_ingredient i ON i.id = ri.ingredient_id
+        WHERE ri.recipe_id = r.id
+    ), r.text
+    FROM recipes_recipe r
+    WHERE r.id IN ({ids})
+'''
+
+
+def sqlite_refresh(ids):
+    return (
+        f'DELETE FROM recipes_recipe_fts WHERE rowid IN ({ids});'
+        + SQLITE_DOCUMENT.format(ids=ids) + ';'
+    )
+
+
+SQLITE_FORWARD = [
+    '''
+    CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5(
+        name, ingredients, text, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    ''',
+    f'''
+    CREATE TRIGGER recipe_fts_insert AFTER INSERT ON recipes_recipe
+    BEGIN {sqlite_refresh('NEW.id')} END
+    ''',
+    f'''
+    CREATE TRIGGER recipe_fts_update AFTER UPDATE OF name, text
+    ON recipes_recipe
+    BEGIN {sqlite_refresh('NEW.id')} END
+    ''',
+    '''
+    CREATE TRIGGER recipe_fts_delete AFTER DELETE ON recipes_recipe
+    BEGIN DELETE FROM recipes_recipe_fts WHERE rowid = OLD.id; END
+    ''',
+    f'''
+    CREATE TRIGGER recipeingredient_fts_insert
+    AFTER INSERT ON recipes_recipeingredient
+    BEGIN {sqlite_refresh('NEW.recipe_id')} END
+    ''',
+    f'''
+    CREATE TRIGGER recipeingredient_fts_update
+    AFTER UPDATE OF recipe_id, ingredient_id ON recipes_recipeingredient
+    BEGIN {sqlite_refresh('OLD.recipe_id, NEW.recipe_id')} END
+    ''',
+    f'''
+    CREATE TRIGGER recipeingredient_fts_delete
+    AFTER DELETE ON recipes_recipeingredient
+    BEGIN {sqlite_refresh('OLD.recipe_id')} END
+    ''',
+    f'''
+    CREATE TRIGGER ingredient_fts_update AFTER UPDATE OF name
+    ON recipes_ingredient
+    BEGIN {sqlite_refresh(
+        'SELECT recipe_id FROM recipes_recipeingredient '
+        'WHERE ingredient_id = NEW.id'
+    )} END
+    ''',
+    SQLITE_DOCUMENT.format(ids='SELECT id FROM recipes_recipe'),
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS ingredient_fts_update',
+    'DROP TRIGGER IF EXISTS recipeingredient_fts_delete',
+    'DROP TRIGGER IF EXISTS recipeingredient_fts_update',
+    'DROP TRIGGER IF EXISTS recipeingredient_fts_insert',
+    'DROP TRIGGER IF EXISTS recipe_fts_delete',
+    'DROP TRIGGER IF EXISTS recipe_fts_update',
+    'DROP TRIGGER IF EXISTS recipe_fts_insert',
+    'DROP TABLE IF EXISTS recipes_recipe_fts',
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRESQL_FORWARD, POSTGRESQL_BACKWARD),
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def install_search(schema_editor):
+    """Создание столбца или таблицы поиска и триггеров для текущей СУБД.
+
+    SQLite пересоздает таблицу рецептов при части изменений схемы,
+    удаляя ее триггеры, поэтому такие миграции вызывают функцию
+    повторно после uninstall_search."""
+
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    # для остальных СУБД поиск выполняется через icontains
+    if statements is not None:
+        for statement in statements[0]:
+            schema_editor.execute(statement, params=None)
+
+
+def uninstall_search(schema_editor):
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements is not None:
+        for statement in statements[1]:
+            schema_editor.execute(statement, params=None)
+
+
+def search_recipes(queryset, text):
+    """Рецепты, найденные по названию, ингредиентам и описанию,
+    упорядоченные по релевантности"""
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        query = SearchQuery(
+            text, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        document = RawSQL(
+            'recipes_recipe.search_vector', (),
+            output_field=SearchVectorField()
+        )
+        return queryset.alias(document=document).filter(
+            document=query
+        ).annotate(
+            search_rank=SearchRank(document, query)
+        ).order_by('-search_rank', '-pub_date', '-id')
+
+    if vendor == 'sqlite':
+        # каждое слово ищется как префикс, что отчасти заменяет
+        # морфологию, которой нет в FTS5
+        words = re.findall(r'\w+', text)
+        if not words:
+            return queryset
+        match = ' '.join(f'"{word}"*' for word in words)
+        # bm25 вычисляется только в запросе к самой таблице FTS5,
+        # поэтому она присоединяется через extra, а не подзапросом
+        return queryset.extra(
+            tables=('recipes_recipe_fts', ),
+            where=(
+                'recipes_recipe_fts.rowid = recipes_recipe.id',
+                'recipes_recipe_fts MATCH %s',
+            ),
+            params=(match, ),
+            select={'search_rank': '-bm25(recipes_recipe_fts, {})'.format(
+                ', '.join(map(str, FTS_WEIGHTS))
+            )},
+        ).order_by('-search_rank', '-pub_date', '-id')
+
+    return queryset.filter(
+        Q(name__icontains=text)
+        | Q(text__icontains=text)
+        | Q(ingredients__name__icontains=text)
+    ).distinct()
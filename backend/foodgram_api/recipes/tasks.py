@@ -0,0 +1,37 @@
+from django.db.models.functions import Now
+
+from api.cache import RECIPES_VERSION
+from api.invalidation import invalidate
+from .images import build_variants, delete_variants, normalize_stored_image
+from .models import Recipe
+
+
+def process_recipe_image(recipe_id, image_name):
+    """Фоновая обработка изображения рецепта: уменьшение,
+    удаление метаданных и построение вариантов"""
+
+    recipes = Recipe.objects.filter(pk=recipe_id, image=image_name)
+    recipe = recipes.only('id', 'image', 'image_variants').first()
+    if recipe is None:
+        # рецепт удален или изображение уже заменено
+        return
+    try:
+        recipe.image.name = normalize_stored_image(recipe.image)
+        variants = build_variants(recipe.image)
+    except Exception:
+        recipes.update(image_status=Recipe.IMAGE_FAILED, updated_at=Now())
+        invalidate(RECIPES_VERSION)
+        raise
+    # варианты предыдущего изображения рецепта больше не нужны
+    delete_variants({
+        variant: name for variant, name in recipe.image_variants.items()
+        if name not in variants.values()
+    })
+    recipes.update(
+        image=recipe.image.name,
+        image_variants=variants,
+        image_status=Recipe.IMAGE_READY,
+        # update не заполняет auto_now
+        updated_at=Now()
+    )
+    invalidate(RECIPES_VERSION)
@@ -1,9 +1,19 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import recipe_link
+from .views import arecipe_link, ashort_link, recipe_link, short_link
 
 app_name = 'recipes'
 
 urlpatterns = [
-    path('recipes/<int:recipe_id>/', recipe_link, name='get_recipe_link'),
+    path(
+        'recipes/<int:recipe_id>/',
+        arecipe_link if settings.ASYNC_VIEWS else recipe_link,
+        name='get_recipe_link'
+    ),
+    path(
+        's/<str:code>/',
+        ashort_link if settings.ASYNC_VIEWS else short_link,
+        name='short_link'
+    ),
 ]
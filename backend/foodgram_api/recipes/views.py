@@ -1,5 +1,9 @@
-from django.shortcuts import get_object_or_404, redirect
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect
 
+from api.short_links import aresolve, flush_link_hits, link_hits, resolve
+from tasks.queue import enqueue
 from .models import Recipe
 
 
@@ -8,3 +12,33 @@ def recipe_link(request, recipe_id):
 
     get_object_or_404(Recipe, pk=recipe_id)
     return redirect(f'/recipes/{recipe_id}')
+
+
+async def arecipe_link(request, recipe_id):
+    """Асинхронный вариант recipe_link для режима ASGI"""
+
+    await aget_object_or_404(Recipe, pk=recipe_id)
+    return redirect(f'/recipes/{recipe_id}')
+
+
+def short_link(request, code):
+    """Переход по короткой ссылке. Код разрешается через кэш,
+    переходы сохраняются в БД пачками"""
+
+    recipe_id = resolve(code)
+    if recipe_id is None:
+        raise Http404
+    if link_hits.add(recipe_id):
+        enqueue(flush_link_hits, link_hits.pop())
+    return redirect(f'/recipes/{recipe_id}')
+
+
+async def ashort_link(request, code):
+    """Асинхронный вариант short_link для режима ASGI"""
+
+    recipe_id = await aresolve(code)
+    if recipe_id is None:
+        raise Http404
+    if link_hits.add(recipe_id):
+        await sync_to_async(enqueue)(flush_link_hits, link_hits.pop())
+    return redirect(f'/recipes/{recipe_id}')
@@ -0,0 +1,39 @@
+from django.contrib import admin
+
+from recipes.admin import BaseAdmin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(BaseAdmin):
+    """Класс для фоновых задач"""
+
+    list_display = ('id', 'name', 'status', 'attempts', 'created_at')
+    list_filter = ('status', 'name')
+    # функция и аргументы задаются только кодом: обработчик
+    # выполняет то, что записано в задаче
+    readonly_fields = (
+        'id',
+        'name',
+        'args',
+        'created_at',
+        'not_before',
+        'started_at',
+        'finished_at'
+    )
+    fields = (
+        'id',
+        'name',
+        'args',
+        'status',
+        'attempts',
+        'error',
+        'created_at',
+        'not_before',
+        'started_at',
+        'finished_at'
+    )
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tasks.queue import claim_tasks, run_task
+
+
+class Command(BaseCommand):
+    help = 'Обработчик фоновых задач из очереди в БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Обработать накопившиеся задачи и завершиться'
+        )
+        parser.add_argument(
+            '--batch', type=int, default=10,
+            help='Количество задач, захватываемых за раз'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Пауза между опросами пустой очереди (в секундах)'
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        while True:
+            close_old_connections()
+            tasks = claim_tasks(options['batch'])
+            for task in tasks:
+                run_task(task)
+            processed += len(tasks)
+            if not tasks:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        self.stdout.write(f'Обработано задач: {processed}')
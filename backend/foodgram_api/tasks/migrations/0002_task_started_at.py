@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Начата'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 07:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_task_started_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='not_before',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Не раньше'),
+        ),
+    ]
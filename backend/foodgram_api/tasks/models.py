@@ -0,0 +1,69 @@
+from django.db import models
+
+
+class Task(models.Model):
+    """Модель фоновой задачи для очереди в БД"""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        verbose_name='Функция',
+        max_length=255
+    )
+    args = models.JSONField(
+        verbose_name='Аргументы',
+        default=list
+    )
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='Попыток',
+        default=0
+    )
+    error = models.TextField(
+        verbose_name='Ошибка',
+        blank=True
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Создана',
+        auto_now_add=True
+    )
+    not_before = models.DateTimeField(
+        verbose_name='Не раньше',
+        null=True,
+        blank=True
+    )
+    started_at = models.DateTimeField(
+        verbose_name='Начата',
+        null=True,
+        blank=True
+    )
+    finished_at = models.DateTimeField(
+        verbose_name='Завершена',
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ('id', )
+        indexes = [
+            models.Index(fields=('status', 'id'), name='task_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name}{tuple(self.args)}: {self.status}'
@@ -0,0 +1,162 @@
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# число попыток выполнения задачи из очереди в БД
+MAX_ATTEMPTS = 3
+
+_executor = None
+
+
+def task_name(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def get_task(name):
+    """Функция задачи из реестра settings.TASKS"""
+
+    if name not in settings.TASKS:
+        raise ValueError(f'Функция {name} не зарегистрирована в TASKS')
+    return import_string(name)
+
+
+def run(name, args):
+    get_task(name)(*args)
+
+
+def run_in_thread(name, args):
+    """Выполнение задачи в потоке со своим подключением к БД"""
+
+    close_old_connections()
+    try:
+        run(name, args)
+    except Exception:
+        logger.exception('Ошибка фоновой задачи %s%s', name, tuple(args))
+    finally:
+        close_old_connections()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.TASKS_THREADS,
+            thread_name_prefix='tasks'
+        )
+    return _executor
+
+
+def enqueue(func, *args):
+    """Постановка задачи в очередь.
+
+    Способ выполнения задается настройкой TASKS_BACKEND:
+    eager - сразу в текущем потоке (для тестов),
+    thread - в пуле потоков процесса после фиксации транзакции,
+    задачи теряются при перезапуске процесса (для разработки),
+    database - запись в таблицу задач для команды run_tasks."""
+
+    name = task_name(func)
+    get_task(name)
+    backend = settings.TASKS_BACKEND
+    if backend == 'eager':
+        run(name, args)
+    elif backend == 'thread':
+        transaction.on_commit(
+            lambda: get_executor().submit(run_in_thread, name, args)
+        )
+    elif backend == 'database':
+        Task.objects.create(name=name, args=list(args))
+    else:
+        raise ValueError(f'Неизвестный TASKS_BACKEND: {backend}')
+
+
+def requeue_stale_tasks():
+    """Возврат в очередь задач, которые выполняются дольше
+    TASKS_RUNNING_TIMEOUT: их обработчик завершился аварийно.
+    Задачи, исчерпавшие попытки, отмечаются как ошибочные"""
+
+    now = timezone.now()
+    timeout = timedelta(seconds=settings.TASKS_RUNNING_TIMEOUT)
+    # у задач, захваченных до появления started_at, время не записано
+    stale = Task.objects.filter(
+        Q(started_at__lt=now - timeout) | Q(started_at__isnull=True),
+        status=Task.RUNNING
+    )
+    requeued = stale.filter(attempts__lt=MAX_ATTEMPTS).update(
+        status=Task.PENDING, not_before=None
+    )
+    failed = stale.update(
+        status=Task.FAILED,
+        error='Обработчик не завершил задачу',
+        finished_at=now
+    )
+    if requeued or failed:
+        logger.warning(
+            'Зависшие задачи: возвращено в очередь %s, с ошибкой %s',
+            requeued, failed
+        )
+    return requeued, failed
+
+
+def claim_tasks(limit):
+    """Захват задач из очереди в БД. Заблокированные другими
+    обработчиками строки пропускаются. Попытка засчитывается при
+    захвате, чтобы аварийное завершение обработчика тоже ее тратило"""
+
+    requeue_stale_tasks()
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(
+            Task.objects.select_for_update(skip_locked=True).filter(
+                Q(not_before__isnull=True) | Q(not_before__lte=now),
+                status=Task.PENDING
+            )[:limit]
+        )
+        Task.objects.filter(pk__in=[task.pk for task in tasks]).update(
+            status=Task.RUNNING,
+            started_at=now,
+            attempts=F('attempts') + 1
+        )
+    for task in tasks:
+        task.status = Task.RUNNING
+        task.started_at = now
+        task.attempts += 1
+    return tasks
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой: TASKS_RETRY_DELAY,
+    удвоенная за каждую неудачную попытку, кроме первой"""
+
+    return timedelta(seconds=settings.TASKS_RETRY_DELAY * 2 ** (
+        attempts - 1
+    ))
+
+
+def run_task(task):
+    try:
+        run(task.name, task.args)
+    except Exception:
+        task.error = traceback.format_exc()
+        if task.attempts < MAX_ATTEMPTS:
+            task.status = Task.PENDING
+            task.not_before = timezone.now() + retry_delay(task.attempts)
+        else:
+            task.status = Task.FAILED
+        logger.exception('Ошибка фоновой задачи %s', task)
+    else:
+        task.error = ''
+        task.status = Task.DONE
+    task.finished_at = timezone.now()
+    task.save(update_fields=('status', 'error', 'not_before', 'finished_at'))
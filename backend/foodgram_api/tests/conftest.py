@@ -0,0 +1,92 @@
+import base64
+import io
+
+import pytest
+from django.core.cache import cache
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кэш и версии наборов данных общие для всех тестов процесса"""
+
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (50, 40), 'red').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='author', email='author@foodgram.ru', password='password',
+        first_name='Автор', last_name='Рецептов'
+    )
+
+
+@pytest.fixture
+def another_user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='reader', email='reader@foodgram.ru', password='password',
+        first_name='Читатель', last_name='Рецептов'
+    )
+
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def another_client(another_user):
+    client = APIClient()
+    client.force_authenticate(another_user)
+    return client
+
+
+@pytest.fixture
+def ingredients():
+    return Ingredient.objects.bulk_create(
+        Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+        for number in range(40)
+    )
+
+
+@pytest.fixture
+def make_recipes(user, ingredients):
+    """Рецепты автора user с тремя ингредиентами каждый"""
+
+    def make_recipes(count, author=user):
+        recipes = [
+            Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Описание',
+                image='recipes/image.png', cooking_time=10
+            )
+            for number in range(count)
+        ]
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=5)
+            for recipe in recipes
+            for ingredient in ingredients[:3]
+        )
+        return recipes
+
+    return make_recipes
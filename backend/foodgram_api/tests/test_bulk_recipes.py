@@ -0,0 +1,60 @@
+import pytest
+
+from recipes.models import Favorite, Recipe, ShoppingCart, ShoppingListItem
+
+URL = '/api/recipes/shopping_cart/'
+
+
+def amounts(user):
+    return dict(
+        ShoppingListItem.objects.filter(user=user).values_list(
+            'ingredient_id', 'amount'
+        )
+    )
+
+
+@pytest.mark.django_db
+def test_bulk_add_counts_only_inserted(another_client, another_user,
+                                       make_recipes):
+    recipes = make_recipes(3)
+    ids = [recipe.id for recipe in recipes]
+    # строка, вставленная параллельным запросом
+    ShoppingCart.add_recipes(another_user, ids[:1])
+    response = another_client.post(URL, {'recipes': ids}, format='json')
+    assert response.status_code == 200
+    assert [item['status'] for item in response.data['recipes']] == [
+        'exists', 'added', 'added'
+    ]
+    assert ShoppingCart.add_recipes(another_user, ids) == set()
+    assert list(
+        Recipe.objects.order_by('id').values_list('cart_count', flat=True)
+    ) == [0, 1, 1]
+    # у каждого рецепта по 5 единиц трех ингредиентов
+    assert set(amounts(another_user).values()) == {15}
+
+
+@pytest.mark.django_db
+def test_bulk_remove_counts_only_deleted(another_client, another_user,
+                                         make_recipes):
+    recipes = make_recipes(2)
+    ids = [recipe.id for recipe in recipes]
+    another_client.post(URL, {'recipes': ids}, format='json')
+    # удаление параллельным запросом
+    assert ShoppingCart.remove_recipes(another_user, ids[:1]) == {ids[0]}
+    response = another_client.delete(URL, {'recipes': ids}, format='json')
+    assert [item['status'] for item in response.data['recipes']] == [
+        'absent', 'removed'
+    ]
+    assert ShoppingCart.remove_recipes(another_user, ids) == set()
+    assert amounts(another_user) == {}
+
+
+@pytest.mark.parametrize('model', (Favorite, ShoppingCart))
+def test_default_query_uses_own_table(model):
+    # выборка по пользователю обходится индексом ограничения
+    # уникальности без соединений и сортировки
+    sql = str(model.objects.filter(user_id=1).values_list(
+        'recipe_id', flat=True
+    ).query)
+    assert 'JOIN' not in sql
+    assert 'ORDER BY' not in sql
@@ -0,0 +1,82 @@
+import io
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from recipes.models import Recipe
+from recipes.tasks import process_recipe_image
+
+
+def detail_url(recipe):
+    return f'/api/recipes/{recipe.id}/'
+
+
+@pytest.mark.django_db
+def test_recipe_validators(client, user_client, make_recipes):
+    recipe, = make_recipes(1)
+    response = client.get(detail_url(recipe))
+    assert response.status_code == 200
+    assert 'ETag' in response
+    response = client.get(
+        detail_url(recipe), HTTP_IF_NONE_MATCH=response['ETag']
+    )
+    assert response.status_code == 304
+    response = client.get(
+        detail_url(recipe), HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+    )
+    assert response.status_code == 304
+    # флаги пользователя времени изменения не имеют
+    assert 'Last-Modified' not in user_client.get(detail_url(recipe))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_other_recipe_change_keeps_etag(client, user_client, make_recipes,
+                                        ingredients):
+    recipe, other = make_recipes(2)
+    etag = client.get(detail_url(recipe))['ETag']
+    response = user_client.patch(detail_url(other), {
+        'name': 'Другое название',
+        'ingredients': [{'id': ingredients[0].id, 'amount': 1}],
+    }, format='json')
+    assert response.status_code == 200
+    response = client.get(detail_url(recipe), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db(transaction=True)
+def test_ingredient_change_changes_etag(client, make_recipes, ingredients):
+    recipe, = make_recipes(1)
+    etag = client.get(detail_url(recipe))['ETag']
+    ingredient = ingredients[0]
+    ingredient.name = 'Новое название'
+    ingredient.save()
+    response = client.get(detail_url(recipe), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db(transaction=True)
+def test_author_change_changes_etag(client, user, make_recipes):
+    recipe, = make_recipes(1)
+    etag = client.get(detail_url(recipe))['ETag']
+    user.first_name = 'Новое имя'
+    user.save()
+    response = client.get(detail_url(recipe), HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data['author']['first_name'] == 'Новое имя'
+
+
+@pytest.mark.django_db
+def test_image_task_updates_updated_at(make_recipes):
+    recipe, = make_recipes(1)
+    buffer = io.BytesIO()
+    Image.new('RGB', (50, 40), 'red').save(buffer, 'PNG')
+    name = default_storage.save('recipes/task.png', ContentFile(
+        buffer.getvalue()
+    ))
+    Recipe.objects.update(image=name)
+    process_recipe_image(recipe.id, name)
+    updated = Recipe.objects.get()
+    assert updated.image_status == Recipe.IMAGE_READY
+    assert updated.updated_at > recipe.updated_at
@@ -0,0 +1,34 @@
+import json
+from pathlib import Path
+
+import pytest
+from django.conf import settings
+from django.core import serializers
+from django.core.management import call_command
+
+from recipes.models import Recipe
+
+INITIAL_DATA = Path(settings.BASE_DIR).parent / 'data' / 'initial_data.json'
+
+
+@pytest.mark.django_db
+def test_initial_data_loads():
+    call_command('loaddata', str(INITIAL_DATA), verbosity=0)
+    assert Recipe.objects.exists()
+    assert not Recipe.objects.filter(short_code=None).exists()
+    assert all(
+        recipe.updated_at == recipe.pub_date
+        for recipe in Recipe.objects.all()
+    )
+
+
+@pytest.mark.django_db
+def test_recipe_without_updated_at_loads(make_recipes, tmp_path):
+    recipe, = make_recipes(1)
+    data = json.loads(serializers.serialize('json', [recipe]))
+    del data[0]['fields']['updated_at']
+    recipe.delete()
+    fixture = tmp_path / 'recipes.json'
+    fixture.write_text(json.dumps(data))
+    call_command('loaddata', str(fixture), verbosity=0)
+    assert Recipe.objects.get().updated_at is not None
@@ -0,0 +1,56 @@
+import pytest
+
+from api.cache import RECIPES_VERSION, get_version
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def author(user, make_recipes):
+    make_recipes(1)
+    return type(user).objects.get(pk=user.pk)
+
+
+def test_signup_keeps_feed(client):
+    version = get_version(RECIPES_VERSION)
+    response = client.post('/api/users/', {
+        'username': 'newcomer', 'email': 'newcomer@foodgram.ru',
+        'password': 'Sup3r-secret', 'first_name': 'Новый',
+        'last_name': 'Пользователь'
+    })
+    assert response.status_code == 201
+    assert get_version(RECIPES_VERSION) == version
+
+
+def test_password_change_keeps_feed(author):
+    version = get_version(RECIPES_VERSION)
+    author.set_password('Another-s3cret')
+    author.save()
+    author.save(update_fields=('last_login', ))
+    assert get_version(RECIPES_VERSION) == version
+
+
+def test_author_name_change_resets_feed(author):
+    version = get_version(RECIPES_VERSION)
+    author.first_name = 'Новое имя'
+    author.save()
+    assert get_version(RECIPES_VERSION) != version
+    version = get_version(RECIPES_VERSION)
+    author.save()
+    assert get_version(RECIPES_VERSION) == version
+
+
+def test_name_change_without_recipes_keeps_feed(another_user, make_recipes):
+    make_recipes(1)
+    version = get_version(RECIPES_VERSION)
+    another_user.first_name = 'Новое имя'
+    another_user.save()
+    assert get_version(RECIPES_VERSION) == version
+
+
+def test_deferred_fields_reset_feed(author):
+    version = get_version(RECIPES_VERSION)
+    deferred = type(author).objects.only('id').get(pk=author.pk)
+    deferred.last_name = 'Другая'
+    deferred.save(update_fields=('last_name', ))
+    assert get_version(RECIPES_VERSION) != version
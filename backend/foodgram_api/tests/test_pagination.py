@@ -0,0 +1,49 @@
+import pytest
+
+from recipes.models import Recipe
+
+URL = '/api/recipes/'
+
+
+@pytest.mark.django_db
+def test_cursor_walks_feed(client, make_recipes):
+    recipes = make_recipes(7)
+    expected = [recipe.id for recipe in sorted(
+        recipes, key=lambda recipe: (recipe.pub_date, recipe.id),
+        reverse=True
+    )]
+    response = client.get(URL, {'cursor': '', 'limit': 3})
+    seen = []
+    while True:
+        assert response.status_code == 200
+        assert 'count' not in response.data
+        seen += [recipe['id'] for recipe in response.data['results']]
+        if response.data['next'] is None:
+            break
+        response = client.get(response.data['next'])
+    assert seen == expected
+
+
+@pytest.mark.django_db
+def test_cursor_count_and_invalid_cursor(client, make_recipes):
+    make_recipes(4)
+    response = client.get(URL, {'cursor': '', 'limit': 3, 'count': 'cached'})
+    assert response.data['count'] == 4
+    response = client.get(URL, {'cursor': 'не курсор'})
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_search_with_cursor_keeps_relevance(client, make_recipes):
+    in_text, in_name = make_recipes(2)
+    Recipe.objects.filter(pk=in_text.pk).update(text='Добавить сахар')
+    Recipe.objects.filter(pk=in_name.pk).update(name='Сахарный пирог')
+    # в порядке публикации первым был бы рецепт in_text
+    Recipe.objects.filter(pk=in_text.pk).update(
+        pub_date=in_name.pub_date.replace(year=in_name.pub_date.year + 1)
+    )
+    response = client.get(URL, {'search': 'сахар', 'cursor': ''})
+    assert response.status_code == 200
+    assert [recipe['id'] for recipe in response.data['results']] == [
+        in_name.id, in_text.id
+    ]
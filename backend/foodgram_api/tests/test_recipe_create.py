@@ -0,0 +1,61 @@
+import pytest
+
+from api.ingredient_index import ingredient_index
+from recipes.models import Ingredient, Recipe
+
+URL = '/api/recipes/'
+
+
+def recipe_data(image, ingredients):
+    return {
+        'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 10,
+        'image': image,
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 10} for ingredient in ingredients
+        ],
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('count', (1, 40))
+def test_create_queries(user_client, ingredients, image,
+                        django_assert_num_queries, count):
+    # ингредиенты, точка сохранения, рецепт, код короткой ссылки,
+    # состав, обработка изображения (3), счетчик рецептов автора,
+    # фиксация точки сохранения и состав для ответа
+    with django_assert_num_queries(11):
+        response = user_client.post(
+            URL, recipe_data(image, ingredients[:count]), format='json'
+        )
+    assert response.status_code == 201
+    assert len(response.data['ingredients']) == count
+    assert response.data['is_favorited'] is False
+    assert response.data['author']['is_subscribed'] is False
+
+
+@pytest.mark.django_db
+def test_create_checks_ingredients_in_database(user_client, ingredients,
+                                               image):
+    # каталог в памяти загружен и не знает об удалении: версия
+    # каталога меняется только после фиксации транзакции
+    ingredient_index.search()
+    Ingredient.objects.filter(pk=ingredients[0].pk).delete()
+    response = user_client.post(
+        URL, recipe_data(image, ingredients[:2]), format='json'
+    )
+    assert response.status_code == 400
+    assert not Recipe.objects.exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('value, data_type', (('abc', 'str'), (True, 'bool')))
+def test_create_rejects_ingredient_id_type(user_client, ingredients, image,
+                                           value, data_type):
+    data = recipe_data(image, ingredients[:1])
+    data['ingredients'][0]['id'] = value
+    response = user_client.post(URL, data, format='json')
+    assert response.status_code == 400
+    assert response.data['ingredients'][0]['id'] == [
+        'Некорректный тип. Ожидалось значение первичного ключа, '
+        f'получен {data_type}.'
+    ]
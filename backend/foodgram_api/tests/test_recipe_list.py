@@ -0,0 +1,62 @@
+import pytest
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+URL = '/api/recipes/'
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('count', (2, 10))
+def test_anonymous_list_queries(client, make_recipes,
+                                django_assert_num_queries, count):
+    make_recipes(count)
+    # число рецептов, страница с авторами, состав рецептов
+    # и ингредиенты
+    with django_assert_num_queries(4):
+        response = client.get(URL, {'limit': count})
+    assert response.status_code == 200
+    assert len(response.data['results']) == count
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('count', (2, 10))
+def test_authenticated_list_queries(another_client, another_user, user,
+                                    make_recipes, django_assert_num_queries,
+                                    count):
+    recipes = make_recipes(count)
+    Favorite.objects.create(user=another_user, recipe=recipes[0])
+    ShoppingCart.objects.create(user=another_user, recipe=recipes[-1])
+    Follow.objects.create(subscriber=another_user, author=user)
+    # к запросам анонима добавляются избранное, корзина и подписки
+    with django_assert_num_queries(7):
+        response = another_client.get(URL, {'limit': count})
+    assert response.status_code == 200
+    flags = {
+        recipe['id']: (recipe['is_favorited'], recipe['is_in_shopping_cart'])
+        for recipe in response.data['results']
+    }
+    assert flags[recipes[0].id] == (True, count == 1)
+    assert flags[recipes[-1].id] == (False, True)
+    assert all(
+        recipe['author']['is_subscribed']
+        for recipe in response.data['results']
+    )
+
+
+@pytest.mark.django_db
+def test_filtered_list_queries(another_client, another_user, make_recipes,
+                               django_assert_num_queries):
+    recipes = make_recipes(10)
+    Favorite.objects.bulk_create(
+        Favorite(user=another_user, recipe=recipe) for recipe in recipes
+    )
+    # лента с фильтром по флагам пользователя не кэшируется,
+    # флаги вычисляются в запросе страницы
+    with django_assert_num_queries(4):
+        response = another_client.get(URL, {'is_favorited': 1, 'limit': 10})
+    assert response.status_code == 200
+    assert response.data['count'] == 10
+    assert all(
+        recipe['is_favorited'] for recipe in response.data['results']
+    )
@@ -0,0 +1,95 @@
+import pytest
+from django.core.cache import cache
+
+from api.cache import RECIPE_INGREDIENTS_VERSION
+from api.recipe_index import RecipeIndex, journal_key, recipe_index
+from recipes.models import ChangeCounter, Recipe, RecipeIngredient
+
+URL = '/api/recipes/match/'
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    # индекс процесса переживает откат транзакции теста
+    recipe_index.__init__()
+    yield
+    recipe_index.__init__()
+
+
+@pytest.fixture
+def pantry(user, ingredients):
+    """Рецепты из ингредиентов 0-1, 0-2 и 3-5"""
+
+    def create(*numbers):
+        recipe = Recipe.objects.create(
+            author=user, name=f'Рецепт {numbers}', text='Описание',
+            image='recipes/image.png', cooking_time=10
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient=ingredients[number], amount=5
+            )
+            for number in numbers
+        )
+        return recipe
+
+    return create(0, 1), create(0, 1, 2), create(3, 4, 5)
+
+
+def ingredient_ids(ingredients, *numbers):
+    return ','.join(str(ingredients[number].id) for number in numbers)
+
+
+@pytest.mark.django_db
+def test_match(client, pantry, ingredients):
+    pair, triple, _ = pantry
+    response = client.get(URL, {
+        'ingredients': ingredient_ids(ingredients, 0, 1), 'missing': 1
+    })
+    assert response.status_code == 200
+    assert [
+        (recipe['id'], recipe['missing'])
+        for recipe in response.data['results']
+    ] == [(pair.id, 0), (triple.id, 1)]
+    response = client.get(URL, {
+        'ingredients': ingredient_ids(ingredients, 0, 1)
+    })
+    assert [recipe['id'] for recipe in response.data['results']] == [
+        pair.id
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_other_process_replays_every_change(pantry, ingredients):
+    pair, triple, _ = pantry
+    # индекс другого процесса
+    index = RecipeIndex()
+    assert index.match([ingredients[3].id]) == []
+    builds = []
+    build = index._build
+    index._build = lambda version: builds.append(version) or build(version)
+    # изменения получают разные номера и обе записи остаются в журнале
+    recipe_index.recipe_changed(pair.id, [ingredients[3].id])
+    recipe_index.recipe_changed(triple.id, None)
+    version = ChangeCounter.current(RECIPE_INGREDIENTS_VERSION)
+    assert cache.get(journal_key(version - 1)) == (
+        pair.id, [ingredients[3].id]
+    )
+    assert cache.get(journal_key(version)) == (triple.id, None)
+    assert index.match([ingredients[3].id]) == [(pair.id, 0)]
+    # рецепт triple удален, у pair больше нет ингредиента 0
+    assert index.match([ingredients[0].id], missing=5) == []
+    assert builds == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_lost_journal_entry_rebuilds_index(pantry, ingredients):
+    pair, _, _ = pantry
+    index = RecipeIndex()
+    index.match([ingredients[0].id])
+    RecipeIngredient.objects.filter(recipe=pair).delete()
+    recipe_index.recipe_changed(pair.id, None)
+    cache.delete(journal_key(
+        ChangeCounter.current(RECIPE_INGREDIENTS_VERSION)
+    ))
+    assert pair.id not in dict(index.match([ingredients[0].id], missing=5))
@@ -0,0 +1,73 @@
+import pytest
+from django.db import connection
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.search import search_recipes
+
+URL = '/api/recipes/'
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor not in ('sqlite', 'postgresql'),
+    reason='полнотекстовый поиск есть только в SQLite и PostgreSQL'
+)
+
+
+def search(client, text):
+    response = client.get(URL, {'search': text})
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.data['results']]
+
+
+@pytest.fixture
+def recipes(user, ingredients):
+    def create(name, text, ingredient):
+        recipe = Recipe.objects.create(
+            author=user, name=name, text=text, image='recipes/image.png',
+            cooking_time=10
+        )
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=5
+        )
+        return recipe
+
+    return (
+        create('Пирог', 'Добавить сахар по вкусу', ingredients[0]),
+        create('Сахарный пирог', 'Испечь', ingredients[1]),
+        create('Хлеб', 'Испечь', ingredients[2]),
+    )
+
+
+@pytest.mark.django_db
+def test_search_ranks_name_above_text(client, recipes):
+    in_text, in_name, _ = recipes
+    assert search(client, 'сахар') == [in_name.id, in_text.id]
+
+
+@pytest.mark.django_db
+def test_search_follows_ingredient_rename(recipes, ingredients):
+    bread = recipes[2]
+
+    def found():
+        return list(search_recipes(Recipe.objects.all(), 'ванилин'))
+
+    assert found() == []
+    Ingredient.objects.filter(pk=ingredients[2].pk).update(name='Ванилин')
+    assert found() == [bread]
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(
+    connection.vendor != 'sqlite', reason='число изменений строк SQLite'
+)
+def test_amount_update_keeps_search_rows(recipes):
+    rows = list(RecipeIngredient.objects.all())
+    for row in rows:
+        row.amount += 1
+    sqlite = connection.connection
+    changes = sqlite.total_changes
+    RecipeIngredient.objects.bulk_update(rows, ('amount', ))
+    Ingredient.objects.update(measurement_unit='кг')
+    # триггеры поиска не перезаписали строки FTS
+    assert sqlite.total_changes - changes == len(rows) + (
+        Ingredient.objects.count()
+    )
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+
+import pytest
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+@pytest.fixture
+def cart(user_client, make_recipes):
+    recipes = make_recipes(2)
+    for recipe in recipes:
+        response = user_client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        assert response.status_code == 201
+    return recipes
+
+
+def download(client, format=None):
+    response = client.get(URL, {'format': format} if format else {})
+    assert response.status_code == 200
+    return response['Content-Type'], b''.join(response.streaming_content)
+
+
+@pytest.mark.django_db
+def test_txt(user_client, cart):
+    content_type, content = download(user_client)
+    assert content_type == 'text/plain'
+    text = content.decode()
+    assert 'Рецепт 0' in text and 'Рецепт 1' in text
+    # у рецептов по 5 г трех ингредиентов
+    assert '1. Ингредиент 0 — 10 г' in text
+
+
+@pytest.mark.django_db
+def test_csv(user_client, cart):
+    content_type, content = download(user_client, 'csv')
+    assert content_type == 'text/csv'
+    rows = list(csv.reader(io.StringIO(content.decode())))
+    assert rows[0] == ['name', 'measurement_unit', 'amount']
+    assert rows[1:] == [
+        [f'Ингредиент {number}', 'г', '10'] for number in range(3)
+    ]
+
+
+@pytest.mark.django_db
+def test_json(user_client, cart):
+    content_type, content = download(user_client, 'json')
+    assert content_type == 'application/json'
+    data = json.loads(content)
+    assert sorted(data['recipes']) == ['Рецепт 0', 'Рецепт 1']
+    assert data['ingredients'][0] == {
+        'name': 'Ингредиент 0', 'measurement_unit': 'г', 'amount': 10
+    }
+
+
+@pytest.mark.django_db
+def test_pdf_embeds_cyrillic_font(user_client, cart):
+    content_type, content = download(user_client, 'pdf')
+    assert content_type == 'application/pdf'
+    assert content.startswith(b'%PDF')
+    # шрифт с кириллицей встроен в документ
+    assert b'DejaVu' in content
+
+
+@pytest.mark.django_db
+def test_pdf_without_font(settings, user_client, cart, tmp_path):
+    settings.SHOPPING_LIST_PDF_FONT = str(tmp_path / 'missing.ttf')
+    response = user_client.get(URL, {'format': 'pdf'})
+    assert response.status_code == 406
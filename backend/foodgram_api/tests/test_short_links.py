@@ -0,0 +1,56 @@
+import io
+import json
+
+import pytest
+from django.core import serializers
+from django.core.management import call_command
+
+from api.short_links import links_version, local_cache, resolve
+from recipes.models import Recipe, encode_short_code
+
+
+@pytest.mark.django_db
+def test_get_link_fills_missing_code(client, make_recipes):
+    recipe, = make_recipes(1)
+    Recipe.objects.update(short_code=None)
+    response = client.get(f'/api/recipes/{recipe.id}/get-link/')
+    code = encode_short_code(recipe.id)
+    assert response.data['short-link'].endswith(f'/s/{code}/')
+    assert Recipe.objects.get().short_code == code
+    response = client.get(f'/s/{code}/')
+    assert response.status_code == 302
+
+
+@pytest.mark.django_db
+def test_fill_short_codes_command(make_recipes):
+    recipes = make_recipes(3)
+    Recipe.objects.update(short_code=None)
+    call_command('fill_short_codes', stdout=io.StringIO())
+    assert sorted(Recipe.objects.values_list('short_code', flat=True)) == (
+        sorted(encode_short_code(recipe.id) for recipe in recipes)
+    )
+
+
+@pytest.mark.django_db
+def test_fixture_recipes_get_codes(make_recipes, tmp_path):
+    recipe, = make_recipes(1)
+    recipe_id = recipe.id
+    data = json.loads(serializers.serialize('json', [recipe]))
+    data[0]['fields']['short_code'] = None
+    recipe.delete()
+    fixture = tmp_path / 'recipes.json'
+    fixture.write_text(json.dumps(data))
+    call_command('loaddata', str(fixture), verbosity=0)
+    assert Recipe.objects.get().short_code == encode_short_code(recipe_id)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_deleted_recipe_leaves_process_cache(make_recipes):
+    recipe, = make_recipes(1)
+    code = recipe.short_code
+    assert resolve(code) == recipe.id
+    # запись в кэше процесса сбрасывает не удаление, а смена версии,
+    # как в процессах, где рецепт не удаляли
+    assert local_cache.get((links_version.get(), code)) == recipe.id
+    recipe.delete()
+    assert resolve(code) is None
@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from recipes.models import Recipe
+from tasks.models import Task
+from tasks.queue import MAX_ATTEMPTS, claim_tasks, enqueue, run_task
+
+URL = '/api/recipes/'
+
+
+def recipe_data(image, ingredients):
+    return {
+        'name': 'Омлет', 'text': 'Описание', 'cooking_time': 10,
+        'image': image,
+        'ingredients': [
+            {'id': ingredient.id, 'amount': 2}
+            for ingredient in ingredients[:2]
+        ],
+    }
+
+
+@pytest.mark.django_db
+def test_eager_recipe_image(user_client, image, ingredients):
+    response = user_client.post(
+        URL, recipe_data(image, ingredients), format='json'
+    )
+    assert response.status_code == 201
+    assert response.data['image_status'] == Recipe.IMAGE_READY
+    assert set(response.data['images']) == {'webp', 'small', 'medium'}
+    assert not Task.objects.exists()
+
+
+@pytest.mark.django_db
+def test_eager_avatar(user_client, user, image):
+    response = user_client.put(
+        '/api/users/me/avatar/', {'avatar': image}, format='json'
+    )
+    assert response.status_code == 200
+    user.refresh_from_db()
+    assert user.avatar
+    assert not Task.objects.exists()
+
+
+@pytest.mark.django_db
+def test_database_queue(settings, user_client, image, ingredients):
+    settings.TASKS_BACKEND = 'database'
+    response = user_client.post(
+        URL, recipe_data(image, ingredients), format='json'
+    )
+    assert response.status_code == 201
+    assert response.data['image_status'] == Recipe.IMAGE_PENDING
+    tasks = claim_tasks(10)
+    assert len(tasks) == 1
+    assert Task.objects.get().status == Task.RUNNING
+    run_task(tasks[0])
+    task = Task.objects.get()
+    assert (task.status, task.attempts) == (Task.DONE, 1)
+    recipe = Recipe.objects.get(pk=response.data['id'])
+    assert recipe.image_status == Recipe.IMAGE_READY
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('attempts, status', (
+    (1, Task.RUNNING),
+    (MAX_ATTEMPTS, Task.FAILED),
+))
+def test_stale_running_task(settings, attempts, status):
+    started_at = timezone.now() - timedelta(
+        seconds=settings.TASKS_RUNNING_TIMEOUT + 1
+    )
+    task = Task.objects.create(
+        name='os.getcwd', status=Task.RUNNING, attempts=attempts,
+        started_at=started_at
+    )
+    fresh = Task.objects.create(
+        name='os.getcwd', status=Task.RUNNING, attempts=1,
+        started_at=timezone.now()
+    )
+    claimed = claim_tasks(10)
+    task.refresh_from_db()
+    # брошенная задача снова захвачена с новой попыткой
+    # или отмечена ошибочной, выполняемая не тронута
+    assert task.status == status
+    assert [claimed_task.pk for claimed_task in claimed] == (
+        [task.pk] if status == Task.RUNNING else []
+    )
+    assert task.attempts == min(attempts + 1, MAX_ATTEMPTS)
+    fresh.refresh_from_db()
+    assert fresh.status == Task.RUNNING
+
+
+@pytest.mark.django_db
+def test_unregistered_task_is_not_run(settings, tmp_path):
+    marker = tmp_path / 'marker'
+    Task.objects.create(name='pathlib.Path.touch', args=[str(marker)])
+    task, = claim_tasks(10)
+    run_task(task)
+    task.refresh_from_db()
+    assert not marker.exists()
+    assert 'не зарегистрирована' in task.error
+    with pytest.raises(ValueError):
+        enqueue(print, 'задача')
+
+
+@pytest.mark.django_db
+def test_failed_task_waits_before_retry(settings, make_recipes):
+    settings.TASKS_RETRY_DELAY = 60
+    recipe, = make_recipes(1)
+    # файла изображения нет: задача завершается ошибкой
+    Task.objects.create(
+        name='recipes.tasks.process_recipe_image',
+        args=[recipe.id, recipe.image.name]
+    )
+    task, = claim_tasks(10)
+    run_task(task)
+    task.refresh_from_db()
+    assert task.status == Task.PENDING
+    assert task.not_before > timezone.now() + timedelta(seconds=50)
+    assert claim_tasks(10) == []
+    Task.objects.update(not_before=timezone.now())
+    task, = claim_tasks(10)
+    assert task.attempts == 2
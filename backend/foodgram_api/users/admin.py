@@ -10,7 +10,16 @@ from .models import User, Follow
 class CustomUserAdmin(UserAdmin, BaseAdmin):
     """Класс для пользователей"""
 
-    list_display = ('username', 'id', 'email', 'first_name', 'last_name')
+    list_display = (
+        'username',
+        'id',
+        'email',
+        'first_name',
+        'last_name',
+        'recipes_count',
+        'followers_count'
+    )
+    readonly_fields = ('id', 'recipes_count', 'followers_count')
     search_fields = ('email', 'username')
     list_filter = ('email', 'username')
     ordering = ('username',)
@@ -24,6 +33,7 @@ class CustomUserAdmin(UserAdmin, BaseAdmin):
         )}),
         ('Permissions', {'fields': ('is_active', 'is_staff', 'is_superuser')}),
         ('Important dates', {'fields': ('last_login', 'date_joined')}),
+        ('Statistics', {'fields': ('recipes_count', 'followers_count')}),
     )
 
 
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
+from api.invalidation import InvalidatingQuerySet
 from .validators import username_validator
 
 
@@ -31,6 +32,16 @@ class User(AbstractUser):
         upload_to='users/user_avatars',
         blank=True, null=False
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -66,6 +77,8 @@ class Follow(models.Model):
         help_text='Подписчик',
     )
 
+    objects = InvalidatingQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
@@ -0,0 +1,18 @@
+from api.cache import RECIPES_VERSION
+from api.invalidation import invalidate
+from recipes.images import normalize_stored_image
+from .models import User
+
+
+def process_avatar(user_id, avatar_name):
+    """Фоновая обработка аватара: уменьшение и удаление метаданных"""
+
+    users = User.objects.filter(pk=user_id, avatar=avatar_name)
+    user = users.only('id', 'avatar').first()
+    if user is None:
+        # пользователь удален или аватар уже заменен
+        return
+    name = normalize_stored_image(user.avatar)
+    if name != avatar_name:
+        users.update(avatar=name)
+        invalidate(RECIPES_VERSION)
@@ -0,0 +1,14 @@
+#!/bin/sh
+# Запуск сервера приложения. SERVER_MODE=wsgi - gunicorn с синхронными
+# воркерами, SERVER_MODE=asgi - uvicorn с асинхронными обработчиками.
+# Количество процессов в обоих режимах задает WEB_WORKERS.
+set -e
+cd foodgram_api
+# проверка настроек: несколько процессов требуют общего кэша
+python manage.py check
+if [ "$SERVER_MODE" = "asgi" ]; then
+    exec uvicorn foodgram_api.asgi:application \
+        --host 0.0.0.0 --port 8000 --workers "${WEB_WORKERS:-1}"
+fi
+exec gunicorn --bind 0.0.0.0:8000 --workers "${WEB_WORKERS:-1}" \
+    foodgram_api.wsgi